@@ -0,0 +1,548 @@
+# HTTP/JSON front end for service.LibraryService, so several desks, a kiosk and the web
+# catalog share one process: one connection pool, one catalog cache and one search index.
+# Standard library only. asyncio handles the connections (HTTP/1.1 with keep-alive); each
+# service call runs on a thread pool as large as the connection pool, so slow SQL never
+# stalls the other clients and the pool is never oversubscribed.
+#
+#     python api_server.py [--host H] [--port P] [--sqlite FILE]
+#     python api_server.py --load-test http://127.0.0.1:8080 [--clients 20] [--seconds 10]
+#
+# Routes (JSON in and out; errors are {"error": message} with a 4xx/5xx status):
+#     GET    /books?after_name=&after_id=&limit=   Catalog page in title order
+#     GET    /books/<id>
+#     POST   /books           {book_id, book_name, author, edition, price, qty}
+#     PUT    /books/<id>      {book_name, author, edition, price, qty}
+#     DELETE /books/<id>
+#     GET    /search?q=&limit=
+#     GET    /loans?roll=     All active loans, or one student's
+#     POST   /loans           {book_ids: [...], stu_roll, stu_name, course, subject, issue_date, return_date}
+#     POST   /returns         {loans: [[stu_roll, book_id], ...]}
+#     POST   /reissues        {book_id, stu_roll, new_return_date, issue_date}
+#     GET    /overdue?limit=
+#     GET    /dashboard?days=&limit=   Circulation of the last days (from the daily rollups)
+#     GET    /stats
+
+import argparse
+import asyncio
+import datetime
+import decimal
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+import credentials as cr
+import storage
+import schema
+import instrumentation
+from db_pool import ConnectionPool, PoolTimeout
+from service import LibraryService, ValidationError
+
+MAX_BODY = 1 << 20         # Largest request body accepted (bytes)
+MAX_HEADER_LINES = 100     # Headers accepted per request
+KEEP_ALIVE_TIMEOUT = 15    # Seconds an idle keep-alive connection is kept open
+RETRY_METHODS = ('GET', 'PUT', 'DELETE') # Idempotent, so ApiClient may resend them after a connection error
+
+BOOK_FIELDS = ('book_id', 'book_name', 'author', 'edition', 'price', 'qty')
+LOAN_FIELDS = ('book_id', 'book_name', 'stu_roll', 'stu_name', 'course', 'subject', 'issue_date', 'return_date')
+OVERDUE_FIELDS = ('book_id', 'book_name', 'stu_roll', 'stu_name', 'return_date', 'days_overdue', 'fine')
+DASHBOARD_FIELDS = {                        # Lists of the dashboard: key -> fields of its rows
+    'top_books': ('book_id', 'book_name', 'issued', 'returned', 'reissued'),
+    'by_course': ('course', 'issued', 'returned', 'reissued'),
+    'by_subject': ('subject', 'issued', 'returned', 'reissued'),
+    'stockouts': ('book_id', 'book_name', 'times', 'last_day', 'qty'),
+}
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 414: "URI Too Long", 431: "Request Header Fields Too Large",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    """Ends a request with an error status and {"error": message}."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _records(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+async def _read_line(reader, status, message):
+    """reader.readline(), answering a line longer than the stream's limit (64 KiB) with HttpError(status)."""
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError): # The rest of the stream cannot be parsed; the connection is closed
+        raise HttpError(status, message) from None
+
+
+class ApiServer:
+    """Routes HTTP requests to a LibraryService; one instance serves every connection."""
+    def __init__(self, service, workers):
+        """
+        Args:
+            service (LibraryService): The operations being served.
+            workers (int): Threads running service calls (at most the pool size is useful).
+        """
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._routes = {
+            ('GET', 'books', 0): self.list_books,
+            ('GET', 'books', 1): self.get_book,
+            ('POST', 'books', 0): self.add_book,
+            ('PUT', 'books', 1): self.update_book,
+            ('DELETE', 'books', 1): self.delete_book,
+            ('GET', 'search', 0): self.search,
+            ('GET', 'loans', 0): self.list_loans,
+            ('POST', 'loans', 0): self.issue,
+            ('POST', 'returns', 0): self.return_books,
+            ('POST', 'reissues', 0): self.reissue,
+            ('GET', 'overdue', 0): self.overdue,
+            ('GET', 'dashboard', 0): self.dashboard,
+            ('GET', 'stats', 0): self.stats,
+        }
+
+    # --- Connections ---
+    async def handle_connection(self, reader, writer):
+        """Serves the requests of one client connection until it closes or idles out."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    self._write_response(writer, e.status, {'error': e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self._dispatch(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Returns (method, target, headers, body), or None if the client closed the connection."""
+        line = await _read_line(reader, 414, "The request line is too long.")
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line.") from None
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await _read_line(reader, 431, "A request header is too long.")
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(400, "Too many headers.")
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, "Bad Content-Length.") from None
+        if length > MAX_BODY:
+            raise HttpError(413, f"Request bodies are limited to {MAX_BODY} bytes.")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        try:
+            body = json.dumps(payload, default=_json_default, allow_nan=False).encode('utf-8')
+        except ValueError as e: # NaN/Infinity would make the body invalid JSON for strict clients
+            print(f"Unserializable response: {e}")
+            status, body = 500, json.dumps({'error': "Internal server error."}).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+    # --- Dispatch ---
+    async def _dispatch(self, method, target, body):
+        """Runs the matching handler on the executor and maps errors to statuses."""
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            url = urlsplit(target)
+            handler, args = self._route(method, url.path)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise HttpError(400, "The request body is not valid JSON.") from None
+            if not isinstance(data, dict):
+                raise HttpError(400, "The request body must be a JSON object.")
+            loop = asyncio.get_running_loop()
+            if not instrumentation.enabled:
+                return await loop.run_in_executor(self.executor, partial(handler, query, data, *args))
+            instrumentation.count("calls.api." + handler.__name__)
+            with instrumentation.span("api." + handler.__name__): # Includes the wait for a free executor thread
+                return await loop.run_in_executor(self.executor, partial(handler, query, data, *args))
+        except HttpError as e:
+            status, message = e.status, e.message
+        except ValidationError as e:
+            status, message = 400, str(e)
+        except PoolTimeout:
+            status, message = 503, "The server is busy; try again."
+        except storage.DatabaseError as e:
+            status, message = 503, f"Database error: {e}"
+        except Exception as e: # Keep serving; the client gets a 500
+            print(f"Unhandled error in {method} {target}: {e!r}")
+            status, message = 500, "Internal server error."
+        finally:
+            self.in_flight -= 1
+        self.errors += 1
+        instrumentation.count(f"api.errors.{status}")
+        return status, {'error': message}
+
+    def _route(self, method, path):
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        if not parts:
+            raise HttpError(404, "No such resource.")
+        resource, args = parts[0], parts[1:]
+        handler = self._routes.get((method, resource, len(args)))
+        if handler is None:
+            if any(key[1:] == (resource, len(args)) for key in self._routes):
+                raise HttpError(405, f"{method} is not supported on /{resource}.")
+            raise HttpError(404, "No such resource.")
+        return handler, args
+
+    # --- Handlers (run on the executor; return (status, payload)) ---
+    def list_books(self, query, data):
+        after = (query['after_name'], query.get('after_id', '')) if 'after_name' in query else None
+        return 200, {'books': _records(BOOK_FIELDS, self.service.list_books(after=after, limit=query.get('limit')))}
+
+    def get_book(self, query, data, book_id):
+        row = self.service.get_book(book_id)
+        if row is None:
+            raise HttpError(404, f"Book ID '{book_id}' not found.")
+        return 200, dict(zip(BOOK_FIELDS, row))
+
+    def add_book(self, query, data):
+        if not self.service.add_book(**{field: data.get(field) for field in BOOK_FIELDS}):
+            raise HttpError(409, f"Book ID '{data.get('book_id')}' already exists.")
+        return 201, {'book_id': data.get('book_id')}
+
+    def update_book(self, query, data, book_id):
+        fields = {field: data.get(field) for field in BOOK_FIELDS[1:]}
+        if not self.service.update_book(book_id, **fields):
+            raise HttpError(404, f"Book ID '{book_id}' not found.")
+        return 200, {'book_id': book_id}
+
+    def delete_book(self, query, data, book_id):
+        borrow_count = self.service.delete_book(book_id)
+        if borrow_count:
+            return 409, {'error': f"Book ID '{book_id}' is borrowed by {borrow_count} student(s).", 'borrow_count': borrow_count}
+        return 200, {'book_id': book_id}
+
+    def search(self, query, data):
+        return 200, {'books': _records(BOOK_FIELDS, self.service.search_books(query.get('q', ''), query.get('limit')))}
+
+    def list_loans(self, query, data):
+        return 200, {'loans': _records(LOAN_FIELDS, self.service.borrow_records(query.get('roll')))}
+
+    def issue(self, query, data):
+        book_ids = data.get('book_ids')
+        if book_ids is not None and not isinstance(book_ids, list):
+            raise HttpError(400, "book_ids must be a list of Book IDs.")
+        book_ids = book_ids or ([data['book_id']] if data.get('book_id') else [])
+        outcomes = self.service.issue_books(book_ids, data.get('stu_roll'), data.get('stu_name'), data.get('course'),
+                                            data.get('subject'), data.get('issue_date'), data.get('return_date'))
+        return 200, {'results': [{'book_id': book_id, 'outcome': outcome} for book_id, outcome in outcomes]}
+
+    def return_books(self, query, data):
+        loans = data.get('loans')
+        if not isinstance(loans, list) or not all(isinstance(loan, (list, tuple)) and len(loan) == 2 for loan in loans):
+            raise HttpError(400, "loans must be a list of [stu_roll, book_id] pairs.")
+        returned = self.service.return_books(loans)
+        return 200, {'returned': [list(loan) for loan in returned], 'requested': len(loans)}
+
+    def reissue(self, query, data):
+        changed = self.service.reissue_book(data.get('book_id'), data.get('stu_roll'), data.get('new_return_date'),
+                                            data.get('issue_date'))
+        if not changed:
+            raise HttpError(404, "No such loan (returned already?).")
+        return 200, {'book_id': data.get('book_id'), 'stu_roll': data.get('stu_roll')}
+
+    def overdue(self, query, data):
+        summary = dict(self.service.overdue(query.get('limit') or 500))
+        summary['rows'] = _records(OVERDUE_FIELDS, summary['rows'])
+        return 200, summary
+
+    def dashboard(self, query, data):
+        dashboard = self.service.dashboard(query.get('days'), query.get('limit'))
+        for key, fields in DASHBOARD_FIELDS.items():
+            dashboard[key] = _records(fields, dashboard[key])
+        return 200, dashboard
+
+    def stats(self, query, data):
+        stats = self.service.stats()
+        stats['server'] = {'requests': self.requests, 'errors': self.errors, 'in_flight': self.in_flight}
+        if instrumentation.enabled:
+            stats['instrumentation'] = instrumentation.snapshot()
+        return 200, stats
+
+
+class ApiClient:
+    """
+    Blocking client for the API with the same method names and return shapes as
+    LibraryService (rows as tuples), for Python clients such as a kiosk. Keeps one
+    keep-alive connection per thread.
+    """
+    def __init__(self, base_url, timeout=10):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def list_books(self, after=None, before=None, limit=150):
+        params = {'limit': limit}
+        if after is not None:
+            params.update(after_name=after[0], after_id=after[1])
+        return [tuple(book[f] for f in BOOK_FIELDS) for book in self._call('GET', '/books', params)['books']]
+
+    def get_book(self, book_id):
+        status, payload = self._request('GET', f"/books/{quote(str(book_id), safe='')}")
+        if status == 404:
+            return None
+        self._check(status, payload)
+        return tuple(payload[f] for f in BOOK_FIELDS)
+
+    def search_books(self, query, limit=500):
+        return [tuple(book[f] for f in BOOK_FIELDS) for book in self._call('GET', '/search', {'q': query, 'limit': limit})['books']]
+
+    def add_book(self, book_id, book_name, author="", edition="", price="", qty=""):
+        status, payload = self._request('POST', '/books', body={'book_id': book_id, 'book_name': book_name, 'author': author,
+                                                                'edition': edition, 'price': price, 'qty': qty})
+        if status == 409:
+            return False
+        self._check(status, payload)
+        return True
+
+    def update_book(self, book_id, book_name, author="", edition="", price="", qty=""):
+        status, payload = self._request('PUT', f"/books/{quote(str(book_id), safe='')}",
+                                        body={'book_name': book_name, 'author': author, 'edition': edition,
+                                              'price': price, 'qty': qty})
+        if status == 404:
+            return 0
+        self._check(status, payload)
+        return 1
+
+    def delete_book(self, book_id):
+        status, payload = self._request('DELETE', f"/books/{quote(str(book_id), safe='')}")
+        if status == 409:
+            return payload['borrow_count']
+        self._check(status, payload)
+        return 0
+
+    def issue_book(self, book_id, book_name, stu_roll, stu_name, course, subject, issue_date, return_date):
+        return self.issue_books([book_id], stu_roll, stu_name, course, subject, issue_date, return_date)[0][1]
+
+    def issue_books(self, book_ids, stu_roll, stu_name, course, subject, issue_date, return_date):
+        payload = self._call('POST', '/loans', body={'book_ids': list(book_ids), 'stu_roll': stu_roll, 'stu_name': stu_name,
+                                                     'course': course, 'subject': subject, 'issue_date': issue_date,
+                                                     'return_date': return_date})
+        return [(result['book_id'], result['outcome']) for result in payload['results']]
+
+    def return_books(self, loans):
+        return [tuple(loan) for loan in self._call('POST', '/returns', body={'loans': [list(loan) for loan in loans]})['returned']]
+
+    def reissue_book(self, book_id, stu_roll, new_return_date, issue_date=None):
+        status, payload = self._request('POST', '/reissues', body={'book_id': book_id, 'stu_roll': stu_roll,
+                                                                   'new_return_date': new_return_date, 'issue_date': issue_date})
+        if status == 404:
+            return 0
+        self._check(status, payload)
+        return 1
+
+    def borrow_records(self, stu_roll=None):
+        params = {'roll': stu_roll} if stu_roll else None
+        return [tuple(loan[f] for f in LOAN_FIELDS) for loan in self._call('GET', '/loans', params)['loans']]
+
+    def dashboard(self, days=30, limit=10):
+        dashboard = self._call('GET', '/dashboard', {'days': days, 'limit': limit})
+        for key, fields in DASHBOARD_FIELDS.items():
+            dashboard[key] = [tuple(row[f] for f in fields) for row in dashboard[key]]
+        return dashboard
+
+    def stats(self):
+        return self._call('GET', '/stats')
+
+    # --- Internal Helpers ---
+    def _call(self, method, path, params=None, body=None):
+        status, payload = self._request(method, path, params, body)
+        self._check(status, payload)
+        return payload
+
+    @staticmethod
+    def _check(status, payload):
+        if status == 400:
+            raise ValidationError(payload.get('error', "Bad request."))
+        if status >= 300:
+            raise storage.OperationalError(f"API error {status}: {payload.get('error')}")
+
+    def _request(self, method, path, params=None, body=None):
+        if params:
+            path += "?" + urlencode(params)
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        retry = method in RETRY_METHODS
+        for attempt in range(2): # A kept-alive connection the server has closed is reopened once (idempotent requests only)
+            connection = getattr(self._local, 'connection', None)
+            if connection is not None and not retry and time.monotonic() - self._local.used > KEEP_ALIVE_TIMEOUT / 2:
+                connection.close() # The server may have dropped it, and a POST is never sent twice
+                connection = None
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, path, body=data, headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                payload = json.loads(response.read() or b'{}')
+                self._local.used = time.monotonic()
+                return response.status, payload
+            except (ConnectionError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                if attempt or not retry:
+                    raise
+
+
+# --- Load Test ---
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def _load_client(host, port, paths, deadline, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < deadline:
+            path = random.choice(paths)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if not status_line.startswith(b'HTTP/1.1 2'):
+                failures.append(status_line.decode('latin-1').strip())
+    finally:
+        writer.close()
+
+
+def load_test(base_url, clients=20, seconds=10):
+    """
+    Runs `clients` concurrent keep-alive clients against a running server for `seconds`,
+    with a read mix like busy desks and catalog users (catalog pages, book lookups,
+    searches, loan lists), and prints throughput and latency.
+    Returns:
+        dict: requests, failures, requests_per_s, p50_ms, p99_ms.
+    """
+    client = ApiClient(base_url)
+    books = client.list_books(limit=500)
+    words = sorted({word for row in books for word in str(row[1] or "").split() if len(word) > 2}) or ["a"]
+    paths = ["/books?limit=150", "/loans", "/stats"]
+    paths += [f"/search?q={quote(random.choice(words))}&limit=50" for _ in range(50)]
+    paths += [f"/books/{quote(str(row[0]), safe='')}" for row in books[:50]]
+    url = urlsplit(base_url)
+    latencies, failures = [], []
+
+    async def run():
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(*(_load_client(url.hostname, url.port or 80, paths, deadline, latencies, failures)
+                               for _ in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {'requests': len(latencies), 'failures': len(failures), 'clients': clients,
+              'requests_per_s': round(len(latencies) / elapsed, 1),
+              'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+              'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2)}
+    print(f"{result['requests']} requests in {elapsed:.1f}s from {clients} clients: "
+          f"{result['requests_per_s']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['failures']} failed")
+    return result
+
+
+# --- Entry Point ---
+async def serve(service, host, port, workers):
+    server = ApiServer(service, workers)
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Serving the library API on http://{host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the library.")
+    parser.add_argument("--host", default=cr.api_host)
+    parser.add_argument("--port", type=int, default=cr.api_port)
+    parser.add_argument("--sqlite", metavar="FILE", help="Serve this SQLite file instead of the backend in credentials.py")
+    parser.add_argument("--load-test", metavar="URL", help="Load-test a running server instead of starting one")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients for --load-test")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of --load-test")
+    parser.add_argument("--instrument", metavar="FILE", nargs="?", const="",
+                        help="Time queries and handlers (shown under /stats); also write them to FILE on exit")
+    args = parser.parse_args()
+    if args.load_test:
+        load_test(args.load_test, args.clients, args.seconds)
+        return
+    if args.instrument is None:
+        args.instrument = instrumentation.requested() # BOOKNEST_INSTRUMENT
+    if args.instrument is not None:
+        instrumentation.enable(cr.slow_query_ms, cr.slow_query_log)
+
+    backend = storage.SQLiteBackend(args.sqlite) if args.sqlite else storage.backend_from_settings(cr)
+    pool = ConnectionPool(backend.connect, size=cr.pool_size, idle_timeout=cr.pool_idle_timeout)
+    with pool.connection() as connection:
+        schema.upgrade(connection)
+    service = LibraryService(pool)
+    service.warm_catalog()
+    try:
+        asyncio.run(serve(service, args.host, args.port, workers=cr.pool_size))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close_all()
+        if args.instrument:
+            instrumentation.dump(args.instrument)
+
+
+if __name__ == "__main__":
+    main()
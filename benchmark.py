@@ -0,0 +1,330 @@
+# Benchmark of the catalog and circulation hot paths. Seeds a fresh database with a synthetic
+# catalog and loans (same seed, same data), then times the calls the screens make: the All
+# Books pages (database and catalog cache), search, issue and return (single and batched),
+# the borrow lists, the desk's row formatting and, when a display is available, inserting
+# the rows into a ttk.Treeview.
+#
+#     python benchmark.py [--books 20000] [--loans 5000] [--repeat 200] [--sqlite FILE]
+#     python benchmark.py --output bench.json --compare old-bench.json
+#
+# Each case reports p50/p99/mean latency, operations per second and the peak memory it
+# allocated (tracemalloc, measured in a separate pass so it does not skew the timings).
+# Results are written as JSON so runs of different versions can be compared with --compare.
+# The database is SQLite (in memory by default); a MySQL database is never touched. Treeview
+# cases need a display (e.g. run under xvfb-run on a server) and are skipped without one.
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import storage
+import schema
+import library_db as ldb
+from db_pool import ConnectionPool
+from row_format import format_book_rows, format_loan_rows
+from service import LibraryService
+
+DEFAULT_BOOKS = 20000     # Catalog size seeded
+DEFAULT_LOANS = 5000      # Active loans seeded (at most MAX_BORROW_LIMIT per student)
+DEFAULT_REPEAT = 200      # Timed calls per case (slow cases use fewer, see build_cases)
+WARMUP = 3                # Untimed calls before each case
+SEED = 1234               # Random seed for the data and the call arguments
+COPIES_PER_BOOK = 5       # Stock of every seeded book
+PAGE_SIZE = 150           # Rows per All Books page, as PagedTreeLoader asks for
+ISSUE_DATE, RETURN_DATE = "2026-01-05", "2026-01-19"
+
+WORDS = ("history modern physics python data art war peace river stone light ocean garden "
+         "empire theory practice guide introduction advanced systems networks chemistry "
+         "biology algebra poetry letters journey mountain city night winter summer music").split()
+
+
+# --- Seeding ---
+def seed_database(connection, books, loans, rng):
+    """
+    Fills an empty database.
+    Returns:
+        dict: book_ids, loans (list of (stu_roll, book_id)), the search queries and the page keys to use.
+    """
+    rows = []
+    for i in range(books):
+        title = " ".join(rng.sample(WORDS, 3)).title()
+        rows.append((f"B{i:07d}", f"{title} {i}", f"Author {i % 997}", str(1 + i % 5),
+                     round(rng.uniform(5, 80), 2), COPIES_PER_BOOK))
+    for start in range(0, len(rows), 5000):
+        ldb.upsert_books(connection, rows[start:start + 5000])
+
+    book_ids = [row[0] for row in rows]
+    loan_pairs, taken = [], {}
+    student = 0
+    while len(loan_pairs) < min(loans, books * (COPIES_PER_BOOK - 1)):
+        stu_roll = f"S{student:06d}"
+        student += 1
+        for book_id in rng.sample(book_ids, min(ldb.MAX_BORROW_LIMIT, len(book_ids))):
+            if len(loan_pairs) >= loans: break
+            if taken.get(book_id, 0) < COPIES_PER_BOOK - 1: # One copy of each book stays for the issue cases
+                taken[book_id] = taken.get(book_id, 0) + 1
+                loan_pairs.append((stu_roll, book_id))
+    with connection.cursor() as curs:
+        curs.executemany("INSERT INTO students (stu_roll, stu_name, course, subject) VALUES (%s, %s, %s, %s)",
+                         [(stu_roll, f"Student {stu_roll}", "BSc", "Physics")
+                          for stu_roll in dict.fromkeys(stu_roll for stu_roll, _ in loan_pairs)])
+        curs.executemany("INSERT INTO loans (stu_roll, book_id, issue_date, return_date) VALUES (%s, %s, %s, %s)",
+                         [(stu_roll, book_id, ISSUE_DATE, RETURN_DATE) for stu_roll, book_id in loan_pairs])
+        curs.executemany("UPDATE book_list SET qty = qty - %s WHERE book_id=%s", [(count, book_id) for book_id, count in taken.items()])
+    connection.commit()
+
+    queries = [rng.choice(WORDS)[:rng.randint(3, 6)] for _ in range(50)] # Prefixes, as typed live
+    queries += [" ".join(rng.sample(WORDS, 2)) for _ in range(50)]
+    return {'book_ids': book_ids, 'loans': loan_pairs, 'queries': queries,
+            'page_keys': [(row[1], row[0]) for row in rng.sample(rows, min(200, len(rows)))]}
+
+
+# --- Measuring ---
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def measure(case, repeat):
+    """
+    Times repeat calls of case() after WARMUP untimed ones, then measures the peak memory of
+    one more call under tracemalloc.
+    Returns:
+        dict: calls, p50_ms, p99_ms, mean_ms, ops_per_s and peak_kb.
+    """
+    for _ in range(WARMUP):
+        case()
+    gc.collect()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        case()
+        latencies.append(time.perf_counter() - started)
+    tracemalloc.start()
+    case()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    total = sum(latencies) or 1e-12
+    return {'calls': repeat, 'p50_ms': round(_percentile(latencies, 0.50) * 1000, 4),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 4),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 4),
+            'ops_per_s': round(repeat / total, 1), 'peak_kb': round(peak / 1024, 1)}
+
+
+def _treeview():
+    """A withdrawn Tk root and a Treeview shaped like the All Books one, or (None, reason)."""
+    try:
+        import tkinter
+        from tkinter import ttk
+        root = tkinter.Tk()
+    except Exception as e: # TclError without a display, ImportError without Tk
+        return None, f"{type(e).__name__}: {e}".strip()
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=('book_id', 'book_name', 'author', 'edition', 'price', 'qty'), show='headings', height=18)
+    tree.pack()
+    return (root, tree), None
+
+
+# --- Cases ---
+def build_cases(service, pool, data, rng, repeat):
+    """Returns [(name, callable, calls)] for every hot path."""
+    book_ids, loans, queries, page_keys = data['book_ids'], data['loans'], data['queries'], data['page_keys']
+    catalog_rows = service.catalog.rows()[:5000]
+    rolls = sorted({stu_roll for stu_roll, _ in loans})
+    counter = iter(range(1 << 30))
+    free_books = itertools.cycle(rng.sample(book_ids, len(book_ids))) # Each seeded book has a copy left
+    pending, pending_batches = [], [] # Loans made by the issue cases, undone by the return cases
+
+    def with_connection(query):
+        def case():
+            with pool.connection() as connection:
+                return query(connection)
+        return case
+
+    def first_page_db(connection):
+        return format_book_rows(ldb.fetch_books_page(connection, limit=PAGE_SIZE))
+
+    def scroll_page_db(connection):
+        return format_book_rows(ldb.fetch_books_page(connection, after=rng.choice(page_keys), limit=PAGE_SIZE))
+
+    def page_cache():
+        return format_book_rows(service.list_books(after=rng.choice(page_keys), limit=PAGE_SIZE))
+
+    def search():
+        return format_book_rows(service.search_books(rng.choice(queries), limit=500))
+
+    def reload_catalog():
+        with pool.connection() as connection:
+            service.load_catalog(connection, reload=True)
+
+    def issue_single():
+        stu_roll, book_id = f"BENCH{next(counter)}", next(free_books)
+        outcome = service.issue_book(book_id, "Bench Book", stu_roll, "Bench Student", "BSc", "Physics", ISSUE_DATE, RETURN_DATE)
+        assert outcome == ldb.ISSUED, outcome
+        pending.append((stu_roll, book_id))
+
+    def return_single():
+        assert len(service.return_books([pending.pop()])) == 1
+
+    def issue_batch():
+        stu_roll = f"BENCH{next(counter)}"
+        batch = [next(free_books) for _ in range(ldb.MAX_BORROW_LIMIT)]
+        outcomes = service.issue_books(batch, stu_roll, "Bench Student", "BSc", "Physics", ISSUE_DATE, RETURN_DATE)
+        assert all(outcome == ldb.ISSUED for _, outcome in outcomes), outcomes
+        pending_batches.append([(stu_roll, book_id) for book_id in batch])
+
+    def return_batch():
+        assert len(service.return_books(pending_batches.pop())) == ldb.MAX_BORROW_LIMIT
+
+    def student_loans(connection):
+        return format_loan_rows(ldb.fetch_borrow_records_for_student(connection, rng.choice(rolls)))
+
+    def all_loans(connection):
+        return format_loan_rows(ldb.fetch_all_borrow_records(connection))
+
+    # Each return case undoes its issue case, so they must run in this order (--only circulation keeps both)
+    cases = [
+        ("show_books.first_page_db", with_connection(first_page_db), repeat),
+        ("show_books.scroll_page_db", with_connection(scroll_page_db), repeat),
+        ("show_books.page_cache", page_cache, repeat),
+        ("catalog.reload", reload_catalog, max(3, repeat // 20)),
+        ("search.index", search, repeat),
+        ("circulation.issue", issue_single, repeat),
+        ("circulation.return", return_single, repeat),
+        ("circulation.issue_batch3", issue_batch, repeat),
+        ("circulation.return_batch3", return_batch, repeat),
+        ("return_screen.student_loans", with_connection(student_loans), repeat),
+        ("book_holders.all_loans", with_connection(all_loans), max(3, repeat // 10)),
+        ("format.book_rows_5000", lambda: format_book_rows(catalog_rows), max(3, repeat // 10)),
+    ]
+    return cases
+
+
+def tree_cases(service, data, repeat):
+    """Treeview insertion cases, or ([], reason) when Tk cannot open a window."""
+    tk, reason = _treeview()
+    if tk is None:
+        return [], None, reason
+    root, tree = tk
+    page = format_book_rows(service.list_books(limit=PAGE_SIZE))
+    everything = format_book_rows(service.catalog.rows()[:5000])
+
+    def insert(rows):
+        def case():
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", 'end', values=row)
+            root.update_idletasks()
+        return case
+
+    return [("treeview.insert_page", insert(page), repeat),
+            ("treeview.insert_5000", insert(everything), max(3, repeat // 20))], root, None
+
+
+# --- Entry Point ---
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # Bytes on macOS, KiB elsewhere
+
+
+def run(books=DEFAULT_BOOKS, loans=DEFAULT_LOANS, repeat=DEFAULT_REPEAT, sqlite_path=":memory:", only=None):
+    """
+    Seeds a database and runs every case.
+    Args:
+        only (str): Run only the cases whose name contains this text.
+    Returns:
+        dict: The results document (see the top of this file).
+    """
+    if sqlite_path != ":memory:" and os.path.exists(sqlite_path):
+        raise SystemExit(f"{sqlite_path} exists; the benchmark needs a new file (or :memory:).")
+    rng = random.Random(SEED)
+    backend = storage.SQLiteBackend(sqlite_path)
+    pool = ConnectionPool(backend.connect, size=2)
+    started = time.perf_counter()
+    with pool.connection() as connection:
+        schema.upgrade(connection)
+        data = seed_database(connection, books, loans, rng)
+    seed_seconds = time.perf_counter() - started
+    service = LibraryService(pool)
+    service.warm_catalog()
+
+    cases = build_cases(service, pool, data, rng, repeat)
+    extra, root, tk_skipped = tree_cases(service, data, repeat)
+    results = {}
+    for name, case, calls in cases + extra:
+        if only and only not in name:
+            continue
+        results[name] = measure(case, calls)
+        print(f"  {name:<38} p50 {results[name]['p50_ms']:9.3f} ms  p99 {results[name]['p99_ms']:9.3f} ms  "
+              f"{results[name]['ops_per_s']:10.1f}/s  peak {results[name]['peak_kb']:9.1f} KiB")
+    if root is not None:
+        root.destroy()
+    pool.close_all()
+
+    return {'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'revision': _git_revision(),
+            'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'platform': platform.platform(),
+            'settings': {'books': books, 'loans': len(data['loans']), 'repeat': repeat, 'database': sqlite_path, 'seed': SEED},
+            'seed_s': round(seed_seconds, 3), 'treeview_skipped': tk_skipped,
+            'peak_rss_kb': _peak_rss_kb(), 'cases': results}
+
+
+def compare(old, new):
+    """Prints the p50/p99 change of every case found in both result documents."""
+    print(f"Compared with {old.get('revision') or '?'} ({old.get('time')}):")
+    for name, case in new['cases'].items():
+        before = old.get('cases', {}).get(name)
+        if not before:
+            continue
+        ratio = lambda key: case[key] / before[key] if before[key] else float('inf')
+        print(f"  {name:<38} p50 x{ratio('p50_ms'):6.2f}  p99 x{ratio('p99_ms'):6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the catalog and circulation hot paths.")
+    parser.add_argument("--books", type=int, default=DEFAULT_BOOKS, help="Catalog size to seed")
+    parser.add_argument("--loans", type=int, default=DEFAULT_LOANS, help="Active loans to seed")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed calls per case")
+    parser.add_argument("--sqlite", default=":memory:", metavar="FILE", help="New SQLite file to use instead of memory")
+    parser.add_argument("--only", help="Run only cases whose name contains this text")
+    parser.add_argument("--output", metavar="FILE", help="Write the results here as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+
+    print(f"Seeding {args.books} books and {args.loans} loans...")
+    result = run(args.books, args.loans, args.repeat, args.sqlite, args.only)
+    if result['treeview_skipped']:
+        print(f"Treeview cases skipped ({result['treeview_skipped']}).")
+    print(f"Peak RSS: {result['peak_rss_kb']} KiB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(result, output_file, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as old_file:
+            compare(json.load(old_file), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# Bulk ISBN import for receiving a shipment. ISBNs come from a file or a barcode scanner (one
+# per line, optionally "isbn,copies"); books already in the catalog just get their quantity
+# raised, new ones are looked up on Open Library in batched requests running in parallel, and
+# everything is written back with a handful of executemany() calls instead of one INSERT each.
+#
+# Catalog files (CSV with full book details, e.g. from a supplier or another system) are loaded
+# by import_catalog_csv(): the file is streamed, each row gets the Add Book form's checks, bad
+# rows go to a reject file, and good ones are upserted in executemany() batches with a commit
+# every few batches. Run it from the desk (Bulk Import screen) or for big files from the shell:
+#
+#     python bulk_import.py catalog.csv [--sqlite library.sqlite3]
+
+import argparse
+import csv
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import library_db as ldb
+from isbn_cache import normalize_isbn
+from openlibrary import MAX_BIBKEYS, parse_book_details
+from service import ValidationError, check_book_fields
+
+DEFAULT_PARALLEL_REQUESTS = 4 # Open Library requests in flight at once
+DEFAULT_WRITE_BATCH = 500     # Rows per executemany() / commit
+CATALOG_BATCH = 1000          # Catalog CSV rows per executemany()
+CATALOG_COMMIT_EVERY = 20000  # Catalog CSV rows per commit
+CATALOG_COLUMNS = ('book_id', 'book_name', 'author', 'edition', 'price', 'qty') # Column order without a header row
+# Column sizes in schema.py; a longer value would make MySQL reject the whole batch
+CATALOG_MAX_LENGTHS = {'book_id': 50, 'book_name': 255, 'author': 512, 'edition': 255}
+MAX_PRICE = 99999999.99       # DECIMAL(10, 2)
+MAX_QTY = 2 ** 31 - 1         # INT
+
+
+def parse_isbn_lines(lines):
+    """
+    Reads ISBNs from text lines: a bare ISBN per line, or CSV with the ISBN in the first
+    column and an optional number of copies in the second. Repeated ISBNs add up, so
+    scanning the same book twice means two copies.
+    Returns:
+        tuple: ({book_id: copies} in first-seen order, [(line_number, line) that were rejected])
+    """
+    copies, rejected = {}, []
+    for line_number, cells in enumerate(csv.reader(lines), 1):
+        cells = [cell.strip() for cell in cells]
+        if not cells or not cells[0]:
+            continue
+        book_id = cells[0].replace('-', '').replace(' ', '').upper()
+        if normalize_isbn(book_id) is None:
+            if line_number == 1 and not any(ch.isdigit() for ch in cells[0]):
+                continue # Header row
+            rejected.append((line_number, ",".join(cells)))
+            continue
+        try:
+            count = int(cells[1]) if len(cells) > 1 and cells[1] else 1
+            if count < 1: raise ValueError
+        except ValueError:
+            rejected.append((line_number, ",".join(cells)))
+            continue
+        copies[book_id] = copies.get(book_id, 0) + count
+    return copies, rejected
+
+
+class ImportProgress:
+    """
+    Counters shared between the import thread and the UI, which polls them for the status bar.
+    Plain attribute writes are atomic in CPython, so no lock is needed for display purposes.
+    """
+    def __init__(self, total):
+        self.total = total          # Distinct ISBNs in the import
+        self.stage = "checking"     # "checking", "lookup", "writing" or "done"
+        self.looked_up = 0
+        self.to_look_up = 0
+        self.written = 0
+        self.started = time.monotonic()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def rate(self):
+        """ISBNs processed per second so far."""
+        elapsed = time.monotonic() - self.started
+        return (self.looked_up + self.written) / elapsed if elapsed > 0 else 0.0
+
+    def describe(self):
+        """One-line summary for the status bar."""
+        if self.stage == "checking":
+            return f"Import: checking {self.total} ISBN(s) against the catalog..."
+        if self.stage == "lookup":
+            return (f"Import: looked up {self.looked_up}/{self.to_look_up} new ISBN(s) on Open Library "
+                    f"({self.rate():.0f}/s)...")
+        if self.stage == "writing":
+            return f"Import: saving {self.written}/{self.total} book(s)..."
+        return f"Import finished: {self.total} ISBN(s) in {time.monotonic() - self.started:.1f}s."
+
+
+def run_import(connection, client, copies, progress, parallel=DEFAULT_PARALLEL_REQUESTS,
+               write_batch=DEFAULT_WRITE_BATCH):
+    """
+    Imports {book_id: copies} into book_list. Runs on a worker thread.
+    Args:
+        connection: Open database connection.
+        client (OpenLibraryClient): Used for metadata of books not in the catalog yet.
+        copies (dict): Output of parse_isbn_lines().
+        progress (ImportProgress): Updated as the import runs; cancelling it stops before the next batch.
+        parallel (int): Maximum concurrent Open Library requests.
+        write_batch (int): Rows per executemany() and commit.
+    Returns:
+        dict: added (rows inserted), restocked ((book_id, copies) for existing books),
+              not_found (ISBNs Open Library does not know), failed (ISBNs whose lookup errored),
+              errors (distinct lookup error messages, for the summary) and cancelled (bool).
+    """
+    result = {'added': [], 'restocked': [], 'not_found': [], 'failed': [], 'errors': [], 'cancelled': False}
+    existing = ldb.fetch_existing_book_ids(connection, copies)
+    result['restocked'] = [(book_id, count) for book_id, count in copies.items() if book_id in existing]
+    new_ids = [book_id for book_id in copies if book_id not in existing]
+
+    # --- Open Library lookups: MAX_BIBKEYS ISBNs per request, `parallel` requests at a time ---
+    progress.stage, progress.to_look_up = "lookup", len(new_ids)
+    batches = [new_ids[start:start + MAX_BIBKEYS] for start in range(0, len(new_ids), MAX_BIBKEYS)]
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(batches))),
+                                thread_name_prefix="isbn-lookup") as executor:
+            futures = {executor.submit(_lookup_batch, client, batch, progress): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    records = future.result()
+                except Exception as e:
+                    if str(e) not in result['errors']:
+                        result['errors'].append(str(e))
+                    result['failed'].extend(batch)
+                    records = {}
+                for book_id in batch:
+                    if book_id not in records:
+                        continue
+                    if records[book_id] is None:
+                        result['not_found'].append(book_id)
+                        continue
+                    details = parse_book_details(records[book_id])
+                    result['added'].append((book_id, details['title'], details['authors'], details['edition'],
+                                            0.0, copies[book_id]))
+                progress.looked_up += len(batch)
+
+    # --- Batched writes, one commit per write_batch rows ---
+    progress.stage = "writing"
+    for start in range(0, len(result['restocked']), write_batch):
+        if progress.cancelled: break
+        chunk = result['restocked'][start:start + write_batch]
+        ldb.add_copies(connection, chunk)
+        progress.written += len(chunk)
+    for start in range(0, len(result['added']), write_batch):
+        if progress.cancelled: break
+        chunk = result['added'][start:start + write_batch]
+        ldb.upsert_books(connection, chunk)
+        progress.written += len(chunk)
+
+    if progress.cancelled:
+        # Only report what was actually committed
+        result['cancelled'] = True
+        committed = progress.written
+        result['restocked'] = result['restocked'][:committed]
+        result['added'] = result['added'][:max(0, committed - len(result['restocked']))]
+    progress.stage = "done"
+    return result
+
+
+def _lookup_batch(client, batch, progress):
+    """Looks up one batch unless the import was cancelled meanwhile (skipped ISBNs are left out)."""
+    if progress.cancelled:
+        return {}
+    return client.fetch_books(batch)
+
+
+# --- Catalog CSV ---
+class CatalogImportProgress:
+    """Counters of a running catalog CSV import, polled by the UI like ImportProgress."""
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path) # Bytes, for the percentage
+        self.bytes_read = 0
+        self.read = 0               # Valid rows read
+        self.written = 0            # Rows committed
+        self.rejected = 0
+        self.started = time.monotonic()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def rate(self):
+        """Rows committed per second so far."""
+        elapsed = time.monotonic() - self.started
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+    def describe(self):
+        """One-line summary for the status bar."""
+        percent = self.bytes_read * 100 // self.size if self.size else 100
+        return (f"Catalog import: {percent}% of {os.path.basename(self.path)}, {self.written} row(s) saved, "
+                f"{self.rejected} rejected ({self.rate():.0f} rows/s)...")
+
+
+def import_catalog_csv(connection, path, progress=None, reject_path=None, batch_size=CATALOG_BATCH,
+                       commit_every=CATALOG_COMMIT_EVERY):
+    """
+    Loads a catalog CSV into book_list. Runs on a worker thread.
+    Columns are CATALOG_COLUMNS in that order, or any order with a header row naming them
+    (author and edition may be missing). New IDs are added; existing ones get the file's
+    name, author, edition and price, and qty more copies - as the Add Book form and the ISBN
+    import count copies. Rows failing the Add Book checks are written to the reject file.
+    Args:
+        connection: Open database connection.
+        path (str): The CSV file (UTF-8, with or without BOM).
+        progress (CatalogImportProgress): Updated as the import runs; cancelling it stops after the current batch.
+        reject_path (str): Where rejected rows go; default <file>.rejects.csv. Only created if a row is rejected.
+        batch_size (int): Rows per executemany().
+        commit_every (int): Rows per commit; a failed import keeps everything committed before it.
+    Returns:
+        dict: written (rows saved), rejected (rows), reject_path (None if nothing was rejected)
+              and cancelled (bool).
+    """
+    progress = progress or CatalogImportProgress(path)
+    reject_path = reject_path or os.path.splitext(path)[0] + ".rejects.csv"
+    rejects = reject_file = None
+    batch, pending = [], 0 # pending: rows sent since the last commit
+
+    def flush():
+        nonlocal batch, pending
+        pending += ldb.upsert_books(connection, batch, update_details=True, commit=False)
+        batch = []
+        if pending >= commit_every:
+            commit()
+
+    def commit():
+        nonlocal pending
+        connection.commit()
+        progress.written += pending
+        pending = 0
+
+    try:
+        with open(path, "rb") as raw_file, io.TextIOWrapper(raw_file, encoding="utf-8-sig", newline="") as text_file:
+            reader = csv.reader(text_file)
+            positions, columns = None, list(CATALOG_COLUMNS)
+            for cells in reader:
+                if not any(cell.strip() for cell in cells):
+                    continue
+                if positions is None:
+                    positions, is_header = _catalog_positions(cells)
+                    if is_header:
+                        columns = cells # Rejected rows are written under the file's own header
+                        continue
+                try:
+                    batch.append(_catalog_row(cells, positions))
+                    progress.read += 1
+                except ValidationError as e:
+                    if rejects is None:
+                        reject_file = open(reject_path, "w", newline="", encoding="utf-8")
+                        rejects = csv.writer(reject_file)
+                        rejects.writerow(["line", "error"] + columns)
+                    rejects.writerow([reader.line_num, str(e)] + cells)
+                    progress.rejected += 1
+                if len(batch) >= batch_size:
+                    flush()
+                    progress.bytes_read = raw_file.tell()
+                    if progress.cancelled:
+                        break
+            else:
+                if batch:
+                    flush()
+                progress.bytes_read = progress.size
+        commit() # Rows sent before a cancel are kept, like the ISBN import's saved batches
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+    return {'written': progress.written, 'rejected': progress.rejected,
+            'reject_path': reject_path if progress.rejected else None, 'cancelled': progress.cancelled}
+
+
+def _catalog_positions(cells):
+    """
+    Returns (cell index of each CATALOG_COLUMNS column or None, True if cells is a header row).
+    Without a header the columns are taken in CATALOG_COLUMNS order.
+    """
+    names = [cell.strip().lower().replace(" ", "_") for cell in cells]
+    if 'book_id' in names and 'book_name' in names:
+        return [names.index(column) if column in names else None for column in CATALOG_COLUMNS], True
+    return list(range(len(CATALOG_COLUMNS))), False
+
+
+def _catalog_row(cells, positions):
+    """
+    Validates one catalog CSV row like the Add Book form, plus the column sizes.
+    Returns:
+        tuple: (book_id, book_name, author, edition, price, qty) ready for upsert_books.
+    Raises:
+        ValidationError: The row cannot be imported.
+    """
+    values = {column: cells[index].strip() if index is not None and index < len(cells) else ""
+              for column, index in zip(CATALOG_COLUMNS, positions)}
+    price, qty = check_book_fields(values['book_id'], values['book_name'], values['price'], values['qty'])
+    for column, limit in CATALOG_MAX_LENGTHS.items():
+        if len(values[column]) > limit:
+            raise ValidationError(f"{column} is longer than {limit} characters.")
+    if price > MAX_PRICE or qty > MAX_QTY:
+        raise ValidationError("Price or Quantity is too large.")
+    return (values['book_id'], values['book_name'], values['author'], values['edition'], price, qty)
+
+
+def main():
+    import credentials as cr
+    import schema
+    import storage
+    parser = argparse.ArgumentParser(description="Load a catalog CSV (book_id, book_name, author, edition, price, qty) into book_list.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--sqlite", metavar="FILE", help="Load into this SQLite file instead of the backend in credentials.py")
+    parser.add_argument("--rejects", metavar="FILE", help="Reject file (default: <csv_file>.rejects.csv)")
+    parser.add_argument("--batch", type=int, default=CATALOG_BATCH, help="Rows per executemany()")
+    parser.add_argument("--commit-every", type=int, default=CATALOG_COMMIT_EVERY, help="Rows per commit")
+    args = parser.parse_args()
+
+    backend = storage.SQLiteBackend(args.sqlite) if args.sqlite else storage.backend_from_settings(cr)
+    connection = backend.connect()
+    progress = CatalogImportProgress(args.csv_file)
+    try:
+        schema.upgrade(connection) # A new SQLite file has no tables yet
+        result = import_catalog_csv(connection, args.csv_file, progress, args.rejects, max(1, args.batch),
+                                    max(1, args.commit_every))
+    except schema.SchemaError as e:
+        raise SystemExit(str(e)) from None
+    finally:
+        connection.close()
+    print(f"Saved {result['written']} row(s) in {time.monotonic() - progress.started:.1f}s "
+          f"({progress.rate():.0f} rows/s).")
+    if result['reject_path']:
+        print(f"Rejected {result['rejected']} row(s); see {result['reject_path']}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# In-process copy of book_list. Screens that only read the catalog (All Books, search, the
+# issue form's name lookup) are served from memory; the database is only asked for the
+# catalog version (one primary-key lookup) to notice changes made at other desks.
+#
+# Coherence: triggers bump library_meta's catalog version once per changed book_list row
+# (see schema.py). Writes made at this desk are applied to the cache directly and counted,
+# so if the database version equals the loaded version plus this desk's own writes, nobody
+# else changed anything and no reload is needed.
+
+import bisect
+import math
+import threading
+import time
+
+# Row layout shared with book_list / customs.columns
+BOOK_ID, BOOK_NAME, QTY = 0, 1, 5
+
+
+def _sort_key(book_name, book_id):
+    """Title order, case-insensitive like MySQL's default collation, ties broken by ID."""
+    return ((book_name or "").casefold(), str(book_id))
+
+
+class CatalogCache:
+    """
+    Thread-safe, lazily loaded map of book_id -> row with a title-sorted view.
+    Loading is done by the caller's load() callable, which returns (version, rows).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock() # Serializes (re)loads
+        self._rows = {}          # book_id -> row tuple
+        self._order = []         # Sorted _sort_key() of every row
+        self.version = None      # Catalog version the contents were loaded at (None if unknown)
+        self.loaded_at = None    # time.monotonic() of the last load
+        self.checked_at = None   # time.monotonic() of the last version check
+        self._local_writes = 0   # Changes made at this desk since the load (each bumped the version once)
+
+    @property
+    def ready(self):
+        return self.loaded_at is not None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def age(self):
+        """Seconds since the last load (infinite if never loaded)."""
+        return time.monotonic() - self.loaded_at if self.ready else math.inf
+
+    # --- Loading ---
+    def ensure_loaded(self, load):
+        """
+        Loads the cache from load() unless it is loaded already; concurrent callers wait for one load.
+        Returns:
+            bool: True if this call loaded it.
+        """
+        with self._load_lock:
+            if self.ready:
+                return False
+            self._replace(*load())
+            return True
+
+    def reload(self, load):
+        """Replaces the contents with a fresh load() (used when another desk changed the catalog)."""
+        with self._load_lock:
+            self._replace(*load())
+
+    def is_current(self, db_version, max_age):
+        """
+        True if the cache still matches the database, given its current catalog version.
+        Without a version (older schema) the cache is trusted for max_age seconds.
+        """
+        with self._lock:
+            self.checked_at = time.monotonic()
+            if db_version is None or self.version is None:
+                return self.age() <= max_age
+            if db_version == self.version + self._local_writes:
+                self.version, self._local_writes = db_version, 0
+                return True
+            return False
+
+    def checked_within(self, seconds):
+        """True if the version was checked less than `seconds` ago."""
+        return self.checked_at is not None and time.monotonic() - self.checked_at < seconds
+
+    # --- Reading ---
+    def get(self, book_id):
+        """Returns the row of a book, or None if it is not in the cache."""
+        with self._lock:
+            return self._rows.get(str(book_id))
+
+    def rows(self):
+        """Returns every row in title order."""
+        with self._lock:
+            return [self._rows[key[1]] for key in self._order]
+
+    def page(self, after=None, before=None, limit=150):
+        """
+        Same contract as library_db.fetch_books_page, answered from memory.
+        Args:
+            after (tuple): Return rows strictly after this (book_name, book_id) key.
+            before (tuple): Return rows strictly before this key (still in ascending order).
+            limit (int): Maximum number of rows.
+        """
+        with self._lock:
+            if before is not None:
+                end = bisect.bisect_left(self._order, _sort_key(*before))
+                keys = self._order[max(0, end - limit):end]
+            else:
+                start = bisect.bisect_right(self._order, _sort_key(*after)) if after is not None else 0
+                keys = self._order[start:start + limit]
+            return [self._rows[key[1]] for key in keys]
+
+    # --- Local Writes (call after the change is committed) ---
+    def add_or_update(self, row):
+        row = (str(row[BOOK_ID]),) + tuple(row[1:])
+        with self._lock:
+            if not self.ready: return
+            self._remove_locked(row[BOOK_ID])
+            self._rows[row[BOOK_ID]] = row
+            bisect.insort(self._order, _sort_key(row[BOOK_NAME], row[BOOK_ID]))
+            self._local_writes += 1
+
+    def remove(self, book_id):
+        with self._lock:
+            if not self.ready: return
+            self._remove_locked(str(book_id))
+            self._local_writes += 1
+
+    def adjust_qty(self, book_id, delta):
+        book_id = str(book_id)
+        with self._lock:
+            if not self.ready: return
+            row = self._rows.get(book_id)
+            if row is not None and isinstance(row[QTY], int):
+                self._rows[book_id] = row[:QTY] + (row[QTY] + delta,) + row[QTY + 1:]
+            self._local_writes += 1
+
+    # --- Internal Helpers ---
+    def _replace(self, version, rows):
+        loaded = {}
+        for row in rows:
+            row = (str(row[BOOK_ID]),) + tuple(row[1:])
+            loaded[row[BOOK_ID]] = row
+        order = sorted(_sort_key(row[BOOK_NAME], book_id) for book_id, row in loaded.items())
+        with self._lock:
+            self._rows, self._order = loaded, order
+            self.version, self._local_writes = version, 0
+            self.loaded_at = self.checked_at = time.monotonic()
+
+    def _remove_locked(self, book_id):
+        row = self._rows.pop(book_id, None)
+        if row is not None:
+            index = bisect.bisect_left(self._order, _sort_key(row[BOOK_NAME], book_id))
+            if index < len(self._order) and self._order[index][1] == book_id:
+                del self._order[index]
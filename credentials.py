@@ -1,6 +1,28 @@
+# Storage Backend
+backend = 'mysql'                 # 'mysql' (server below) or 'sqlite' (embedded file, no server needed)
+sqlite_path = 'library.sqlite3'   # Database file used when backend = 'sqlite' (':memory:' for a throwaway one)
+
 # User Credentials
 host = 'localhost'
 user = 'root'
 password = 'Pikachu28?'
 database = 'library_management'
 
+# Connection Pool
+pool_size = 5             # Max open connections the app keeps to the server
+pool_idle_timeout = 300   # Seconds an unused connection stays open before it is closed
+
+# Open Library
+openlibrary_url = 'https://openlibrary.org/api/books'   # Books API endpoint (point at a local server for testing)
+
+# Overdue Loans
+fine_per_day = 1.00          # Fine per day a book is kept past its return date
+overdue_scan_minutes = 15    # How often the overdue list is rebuilt (by whichever desk gets there first)
+
+# API Server (api_server.py)
+api_host = '127.0.0.1'   # Interface the HTTP/JSON server listens on ('0.0.0.0' to serve other machines)
+api_port = 8080          # Port of the HTTP/JSON server
+
+# Instrumentation (main.py / api_server.py --instrument)
+slow_query_ms = 200   # Statements taking this long or longer go to the slow-query log
+slow_query_log = ''   # File the slow-query log is appended to as JSON lines ('' = in memory only)
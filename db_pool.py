@@ -0,0 +1,212 @@
+# Connection pool for the database. Handlers borrow an open connection instead of
+# paying a full TCP + auth handshake on every click, and hand it back when they are done.
+
+import threading
+import time
+from contextlib import contextmanager
+
+import storage
+import instrumentation
+
+
+class PoolTimeout(storage.OperationalError):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived storage connections.
+    Connections are health-checked (ping) on checkout, closed after sitting idle too
+    long, and transparently replaced when the server has dropped them.
+    """
+    def __init__(self, connect, size=5, idle_timeout=300, checkout_timeout=10):
+        """
+        Args:
+            connect (callable): Factory returning a new connection (e.g. a storage backend's connect).
+            size (int): Maximum number of open connections (idle + checked out).
+            idle_timeout (float): Seconds an idle connection may live before eviction.
+            checkout_timeout (float): Seconds to wait for a free connection when the pool is full.
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self._connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = []      # Stack of (connection, last_used) - most recent last
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters shown in the status bar
+        self.hits = 0        # Checkout served by an idle connection
+        self.misses = 0      # Checkout needed a brand new connection
+        self.reconnects = 0  # Idle connection failed its ping and was replaced
+        self.evictions = 0   # Idle connection closed for exceeding idle_timeout
+
+    # --- Checkout / Checkin ---
+    def acquire(self):
+        """Returns a healthy connection, reusing an idle one when possible."""
+        deadline = time.monotonic() + self.checkout_timeout
+        stale = []
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise storage.InterfaceError("Connection pool is closed.")
+                stale.extend(self._evict_idle_locked())
+                if self._idle:
+                    connection, _ = self._idle.pop()
+                    self._in_use += 1
+                    reused = True
+                    break
+                if self._in_use < self.size:
+                    connection = None
+                    self._in_use += 1
+                    reused = False
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s (pool size {self.size}).")
+                self._cond.wait(remaining)
+
+        # Network work happens outside the lock so other threads are not blocked by it
+        for conn in stale:
+            self._discard(conn)
+        try:
+            if reused:
+                if self._is_alive(connection):
+                    self._count("hits")
+                    return connection
+                self._discard(connection)
+                self._count("reconnects")
+            else:
+                self._count("misses")
+            return self._open()
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection):
+        """Returns a connection to the pool, ending any transaction it left open."""
+        if connection is None:
+            return
+        healthy = False
+        if connection.open:
+            try:
+                # Ends the transaction (and its REPEATABLE READ snapshot) so the next
+                # borrower does not see stale data or inherit held locks.
+                connection.rollback()
+                healthy = True
+            except storage.DatabaseError:
+                healthy = False
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._cond.notify()
+        if connection is not None:
+            self._discard(connection)
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection; rolls back if the block raises."""
+        with instrumentation.span("db.checkout"): # Includes waiting for a free connection
+            connection = self.acquire()
+        try:
+            yield connection
+        except BaseException:
+            try:
+                if connection.open:
+                    connection.rollback()
+            except storage.DatabaseError:
+                pass
+            raise
+        finally:
+            self.release(connection)
+
+    # --- Maintenance ---
+    def warm(self, count=1):
+        """
+        Opens connections ahead of time (e.g. in the background at start-up) until `count`
+        are open, so the first checkouts are hits instead of paying the handshake.
+        Returns:
+            int: Number of connections opened.
+        """
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) + self._in_use >= min(count, self.size):
+                    return opened
+                self._in_use += 1 # Reserve the slot while connecting outside the lock
+            try:
+                connection = self._open()
+            except BaseException:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond: # Swap the reservation for the idle entry in one step
+                self._in_use -= 1
+                closed = self._closed
+                if not closed:
+                    self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+            if closed:
+                self._discard(connection)
+                return opened
+            opened += 1
+
+    def close_all(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Returns a snapshot of the pool counters."""
+        with self._cond:
+            return {'size': self.size, 'idle': len(self._idle), 'in_use': self._in_use,
+                    'hits': self.hits, 'misses': self.misses,
+                    'reconnects': self.reconnects, 'evictions': self.evictions}
+
+    # --- Internal Helpers ---
+    def _open(self):
+        if not instrumentation.enabled:
+            return self._connect()
+        with instrumentation.span("db.connect"):
+            return self._connect()
+
+    def _evict_idle_locked(self):
+        """Removes and returns idle connections older than idle_timeout. Caller must hold the lock."""
+        if not self._idle or self.idle_timeout is None:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = [conn for conn, last_used in self._idle if last_used < cutoff]
+        if stale:
+            self._idle = [(conn, last_used) for conn, last_used in self._idle if last_used >= cutoff]
+            self.evictions += len(stale)
+        return stale
+
+    def _is_alive(self, connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _count(self, name):
+        with self._cond:
+            setattr(self, name, getattr(self, name) + 1)
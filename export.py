@@ -0,0 +1,185 @@
+# Export of the catalog and the loans (borrow records) to CSV or Parquet, e.g. for nightly
+# reporting. Rows are read through a streaming cursor (pymysql's SSCursor on MySQL) a chunk at
+# a time and written out at once, so memory use stays the same whatever the table size.
+# The file is written under a temporary name and renamed when complete, so a report job never
+# picks up half an export. Parquet needs pyarrow (pip install pyarrow); CSV needs nothing.
+#
+#     python export.py loans loans.csv                (format from the extension)
+#     python export.py books catalog.parquet --sqlite library.sqlite3
+
+import argparse
+import csv
+import datetime
+import importlib.util
+import os
+import threading
+import time
+
+import library_db as ldb
+
+FORMATS = ("csv", "parquet")
+TEMP_SUFFIX = ".part"   # Appended to the file name while the export is being written
+
+
+def parquet_available():
+    """True if pyarrow is installed (without importing it)."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def format_for(path):
+    """Export format from the file extension: "parquet" for .parquet/.pq, otherwise "csv"."""
+    return "parquet" if os.path.splitext(path)[1].lower() in (".parquet", ".pq") else "csv"
+
+
+class ExportProgress:
+    """
+    Counters shared between the export thread and the UI, which polls them for the status bar.
+    Plain attribute writes are atomic in CPython, so no lock is needed for display purposes.
+    """
+    def __init__(self, name):
+        self.name = name            # Key of library_db.EXPORTS
+        self.total = None           # Rows to write, once counted
+        self.written = 0
+        self.started = time.monotonic()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def rate(self):
+        """Rows written per second so far."""
+        elapsed = time.monotonic() - self.started
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+    def describe(self):
+        """One-line summary for the status bar."""
+        if self.total is None:
+            return f"Export: counting {self.name}..."
+        percent = f" ({self.written * 100 // self.total}%)" if self.total else ""
+        return f"Export: wrote {self.written}/{self.total} {self.name} rows{percent}, {self.rate():.0f} rows/s..."
+
+
+def export_rows(connection, name, path, fmt=None, progress=None, chunk_size=ldb.EXPORT_BATCH):
+    """
+    Writes the named export (see library_db.EXPORTS) to path. Runs on a worker thread.
+    Args:
+        connection: Open database connection; busy for the whole export.
+        name (str): "books" or "loans".
+        path (str): Output file; replaced only once the export is complete.
+        fmt (str): "csv" or "parquet"; None picks it from the extension.
+        progress (ExportProgress): Updated per chunk; cancelling it stops before the next one.
+        chunk_size (int): Rows per fetch and write (a Parquet row group each).
+    Returns:
+        int: Rows written, or None if cancelled (no file is left behind then).
+    Raises:
+        ValueError: Unknown export or format.
+        RuntimeError: Parquet was asked for without pyarrow installed.
+    """
+    if name not in ldb.EXPORTS:
+        raise ValueError(f"Unknown export {name!r}; choose one of {', '.join(ldb.EXPORTS)}.")
+    fmt = fmt or format_for(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; choose one of {', '.join(FORMATS)}.")
+    if fmt == "parquet" and not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); export to .csv instead.")
+    progress = progress or ExportProgress(name)
+    columns, types, _, _ = ldb.EXPORTS[name]
+    progress.total = ldb.count_export_rows(connection, name) # Before streaming; the connection is busy after
+
+    temp_path = path + TEMP_SUFFIX
+    writer = _CsvWriter(temp_path, columns) if fmt == "csv" else _ParquetWriter(temp_path, columns, types)
+    chunks = ldb.stream_export_rows(connection, name, chunk_size)
+    try:
+        for rows in chunks:
+            if progress.cancelled:
+                break
+            writer.write(rows)
+            progress.written += len(rows)
+    except BaseException:
+        writer.close()
+        os.remove(temp_path)
+        raise
+    finally:
+        chunks.close() # Ends the streaming read, so the connection can be used again
+    writer.close()
+    if progress.cancelled:
+        os.remove(temp_path)
+        return None
+    os.replace(temp_path, path)
+    return progress.written
+
+
+# --- Writers ---
+class _CsvWriter:
+    """Header row, then the rows as they come (dates as YYYY-MM-DD, NULL as an empty cell)."""
+    def __init__(self, path, columns):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(columns)
+
+    def write(self, rows):
+        self._csv.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    """One row group per chunk, with typed columns (prices as float64, dates as date32)."""
+    def __init__(self, path, columns, types):
+        import pyarrow as pa # Deferred: optional, and only Parquet exports need it
+        import pyarrow.parquet as pq
+        self._pa = pa
+        arrow_types = {'str': pa.string(), 'number': pa.float64(), 'int': pa.int64(), 'date': pa.date32()}
+        self._schema = pa.schema([(column, arrow_types[kind]) for column, kind in zip(columns, types)])
+        self._convert = [_CONVERTERS[kind] for kind in types]
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        arrays = [self._pa.array([None if value is None else convert(value) for value in values], type=field.type)
+                  for values, convert, field in zip(zip(*rows), self._convert, self._schema)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def _to_date(value):
+    """DATE columns come back as datetime.date from MySQL and as 'YYYY-MM-DD' text from SQLite."""
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value)[:10])
+
+
+_CONVERTERS = {'str': str, 'number': float, 'int': int, 'date': _to_date}
+
+
+def main():
+    import credentials as cr
+    import schema
+    import storage
+    parser = argparse.ArgumentParser(description="Export the catalog or the loans to CSV or Parquet.")
+    parser.add_argument("export", choices=sorted(ldb.EXPORTS), help="What to export")
+    parser.add_argument("output", help="Output file (.csv, or .parquet with pyarrow installed)")
+    parser.add_argument("--format", choices=FORMATS, help="Override the format chosen from the extension")
+    parser.add_argument("--sqlite", metavar="FILE", help="Read this SQLite file instead of the backend in credentials.py")
+    parser.add_argument("--chunk", type=int, default=ldb.EXPORT_BATCH, help="Rows per fetch and write")
+    args = parser.parse_args()
+
+    backend = storage.SQLiteBackend(args.sqlite) if args.sqlite else storage.backend_from_settings(cr)
+    connection = backend.connect()
+    progress = ExportProgress(args.export)
+    try:
+        schema.upgrade(connection) # A new SQLite file has no tables yet, an older database lacks columns
+        written = export_rows(connection, args.export, args.output, args.format, progress, max(1, args.chunk))
+    except (ValueError, RuntimeError, schema.SchemaError) as e:
+        raise SystemExit(str(e)) from None
+    finally:
+        connection.close()
+    print(f"Exported {written} {args.export} rows to {args.output} in {time.monotonic() - progress.started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Decoded images and their resized variants, shared by the welcome background and the Add
+# Book cover preview. Each source is decoded once; every (source, size) variant is kept in a
+# bounded LRU, so showing the welcome screen again or redisplaying a cover is a dict lookup
+# instead of a disk read, a decode and a full LANCZOS resize.
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_SOURCES = 8    # Decoded originals kept
+DEFAULT_MAX_VARIANTS = 32  # Resized variants kept (all sources together)
+REDUCING_GAP = 2.0         # Big downscales first shrink by an integer factor (fast), then LANCZOS the last 2x
+
+
+def fit_size(width, height, max_width, max_height):
+    """Largest (width, height) with the image's aspect ratio that fits inside the box (at least 1x1)."""
+    scale = min(max_width / width, max_height / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class ImageAssets:
+    """
+    Thread-safe cache of decoded images and resized variants, keyed by a caller-chosen name
+    (a file path, "cover:<isbn>", ...). Decoding and resizing run outside the lock, so a
+    worker thread preparing a cover never blocks the main thread.
+    """
+    def __init__(self, max_sources=DEFAULT_MAX_SOURCES, max_variants=DEFAULT_MAX_VARIANTS):
+        self.max_sources = max_sources
+        self.max_variants = max_variants
+        self._lock = threading.Lock()
+        self._sources = OrderedDict()   # key -> decoded PIL image, least recently used first
+        self._variants = OrderedDict()  # (key, size, tag) -> resized image (or its wrapped form)
+        self.hits = 0
+        self.misses = 0
+
+    def source(self, key, opener, hint=None):
+        """
+        Returns the decoded image for key, calling opener() only the first time.
+        Args:
+            opener (callable): Returns an unloaded PIL image (e.g. Image.open(path)), or None to give up.
+            hint (tuple): Largest size the image will ever be shown at. JPEGs are then decoded at a
+                reduced scale (draft mode), which is several times faster for large photos.
+        Returns:
+            PIL.Image.Image: The decoded image, or None if opener() returned None (not cached).
+        """
+        with self._lock:
+            image = self._sources.get(key)
+            if image is not None:
+                self._sources.move_to_end(key)
+                return image
+        image = opener()
+        if image is None:
+            return None
+        if hint is not None:
+            image.draft(image.mode, (int(hint[0] * REDUCING_GAP), int(hint[1] * REDUCING_GAP)))
+        image.load()
+        with self._lock:
+            self._sources[key] = image
+            self._sources.move_to_end(key)
+            while len(self._sources) > self.max_sources:
+                self._sources.popitem(last=False)
+        return image
+
+    def fit(self, key, max_size, opener, hint=None, wrap=None, tag=None):
+        """
+        Returns the image scaled to fit inside max_size (aspect ratio kept), from the LRU if possible.
+        Args:
+            max_size (tuple): (width, height) box in pixels.
+            opener, hint: See source().
+            wrap (callable): Applied to the resized image before it is cached, so an expensive
+                wrapper (e.g. a CTkImage, which must be made on the main thread) is reused as well.
+            tag (str): Distinguishes wrapped variants from plain ones of the same size.
+        Returns:
+            The resized PIL image (or wrap() of it), or None if opener() returned None.
+        """
+        size = (max(1, int(max_size[0])), max(1, int(max_size[1])))
+        variant_key = (key, size, tag)
+        with self._lock:
+            variant = self._variants.get(variant_key)
+            if variant is not None:
+                self._variants.move_to_end(variant_key)
+                self.hits += 1
+                return variant
+            self.misses += 1
+        if wrap is not None: # Wrap the plain variant, so a size resized on a worker thread is not redone here
+            variant = self.fit(key, size, opener, hint=hint)
+            if variant is None:
+                return None
+            variant = wrap(variant)
+        else:
+            image = self.source(key, opener, hint=hint)
+            if image is None:
+                return None
+            target = fit_size(image.width, image.height, *size)
+            if target == image.size:
+                variant = image
+            else:
+                from PIL import Image # Deferred so importing this module does not load Pillow
+                variant = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+        with self._lock:
+            self._variants[variant_key] = variant
+            while len(self._variants) > self.max_variants:
+                self._variants.popitem(last=False)
+        return variant
+
+    def peek(self, key, max_size, tag=None):
+        """Returns a cached variant without loading anything (None on a miss)."""
+        size = (max(1, int(max_size[0])), max(1, int(max_size[1])))
+        with self._lock:
+            variant = self._variants.get((key, size, tag))
+            if variant is not None:
+                self._variants.move_to_end((key, size, tag))
+                self.hits += 1
+            return variant
+
+    def forget(self, key):
+        """Drops a source and all of its variants (e.g. after the file changed)."""
+        with self._lock:
+            self._sources.pop(key, None)
+            for variant_key in [k for k in self._variants if k[0] == key]:
+                del self._variants[variant_key]
+
+    def stats(self):
+        """Returns hit/miss counters and current sizes."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'sources': len(self._sources), 'variants': len(self._variants)}
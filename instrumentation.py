@@ -0,0 +1,214 @@
+# Opt-in timing of the hot paths: connecting, each SQL execute/fetch, row formatting, Treeview
+# updates and every screen's round trip (click -> worker -> result on screen), with per-handler
+# counters and a slow-query log. Off by default; turn it on with
+#
+#     python main.py --instrument                 (F12 opens the stats screen)
+#     python main.py --instrument=stats.json      (also writes the stats there on exit)
+#
+# or BOOKNEST_INSTRUMENT=<file> (api_server.py takes the same flag; its /stats then includes them).
+# While disabled, every hook costs one check of the module-level `enabled` flag: call sites
+# test it before reading the clock, and span() hands back a shared no-op object.
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+INSTRUMENT_FLAG = "--instrument"
+INSTRUMENT_ENV = "BOOKNEST_INSTRUMENT"
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000) # Histogram upper bounds; the last bucket is open
+SLOW_LOG_SIZE = 100     # Slow queries kept in memory
+SQL_SHOWN = 300         # Characters of a slow statement kept
+
+enabled = False         # Checked by every hook; nothing is recorded while False
+slow_query_ms = 200     # Statements slower than this go to the slow-query log
+slow_query_file = None  # JSON-lines file slow queries are appended to (None = memory only)
+
+_lock = threading.Lock()
+_stats = {}             # span name -> _Stat
+_counters = {}          # counter name -> int
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+_since = time.time()
+
+
+def requested():
+    """
+    Returns None (not requested), "" (on, no dump file) or the path to write the stats to on
+    exit, from --instrument[=file] or BOOKNEST_INSTRUMENT.
+    """
+    for arg in sys.argv[1:]:
+        if arg == INSTRUMENT_FLAG:
+            return ""
+        if arg.startswith(INSTRUMENT_FLAG + "="):
+            return arg.split("=", 1)[1]
+    return os.environ.get(INSTRUMENT_ENV) or None
+
+
+class _Stat:
+    """Count, total, max and a fixed-bucket latency histogram of one span name."""
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        ms = seconds * 1000
+        for index, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, fraction):
+        """Upper bound (ms) of the bucket holding the given quantile; the max for the open bucket."""
+        target = fraction * self.count
+        seen = 0
+        for index, hits in enumerate(self.buckets):
+            seen += hits
+            if hits and seen >= target:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else round(self.max * 1000, 2)
+        return 0
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {'count': self.count, 'total_ms': round(self.total * 1000, 2),
+                'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0,
+                'max_ms': round(self.max * 1000, 2), 'p50_ms': self.quantile(0.50), 'p99_ms': self.quantile(0.99),
+                'histogram': {label: hits for label, hits in zip(labels, self.buckets) if hits}}
+
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.started)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# --- Switching ---
+def enable(slow_ms=None, slow_file=None):
+    """Starts recording (from a clean slate)."""
+    global enabled, slow_query_ms, slow_query_file
+    if slow_ms is not None:
+        slow_query_ms = slow_ms
+    slow_query_file = slow_file or None
+    reset()
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Forgets everything recorded so far."""
+    global _since
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+        _slow.clear()
+        _since = time.time()
+
+
+# --- Recording (callers check `enabled` first where the clock read itself matters) ---
+def span(name):
+    """Context manager timing its block under name; a shared no-op while disabled."""
+    return _Span(name) if enabled else _NULL_SPAN
+
+
+def record(name, seconds):
+    """Adds one timing sample."""
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = _Stat()
+        stat.add(seconds)
+
+
+def count(name, amount=1):
+    """Bumps a counter (e.g. how often a handler ran)."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def record_query(kind, sql, seconds):
+    """Times a statement under db.<kind> and logs it if it took slow_query_ms or longer."""
+    record("db." + kind, seconds)
+    if seconds * 1000 < slow_query_ms:
+        return
+    entry = {'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'ms': round(seconds * 1000, 2), 'kind': kind,
+             'thread': threading.current_thread().name, 'sql': " ".join(sql.split())[:SQL_SHOWN]}
+    with _lock:
+        _slow.append(entry)
+        path = slow_query_file
+    if path:
+        try:
+            with open(path, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(entry) + "\n")
+        except OSError:
+            pass # Losing a log line must never break a query
+
+
+def timed(func):
+    """Decorator for UI handlers: counts their calls and times their synchronous part (handler.<name>)."""
+    name = func.__name__
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        count("calls." + name)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record("handler." + name, time.perf_counter() - started)
+    wrapper.__name__ = name
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+# --- Reading ---
+def snapshot():
+    """Everything recorded so far as a JSON-ready dict."""
+    with _lock:
+        return {'enabled': enabled, 'since': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_since)),
+                'slow_query_ms': slow_query_ms,
+                'spans': {name: stat.to_dict() for name, stat in sorted(_stats.items())},
+                'counters': dict(sorted(_counters.items())), 'slow_queries': list(_slow)}
+
+
+def dump(path):
+    """Writes snapshot() to path as JSON."""
+    with open(path, "w", encoding="utf-8") as dump_file:
+        json.dump(snapshot(), dump_file, indent=2)
@@ -0,0 +1,184 @@
+# Persistent cache for Open Library lookups, keyed by normalized ISBN. Parsed metadata and raw
+# cover bytes are kept in a local SQLite file, so scanning the same ISBN again (e.g. a donation
+# of duplicate textbooks) is answered instantly and also works offline.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "isbn_cache.sqlite3")
+DEFAULT_TTL = 30 * 24 * 3600          # Seconds before an entry is considered stale and re-fetched
+NOT_FOUND_TTL = 24 * 3600             # "No such ISBN" answers expire sooner (the record may be added later)
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024 # Total size of metadata + covers before LRU eviction
+
+MISS = object() # Returned by get_metadata() when the ISBN is not cached (None means "known not found")
+
+
+def normalize_isbn(text):
+    """
+    Returns the ISBN-13 form of an ISBN-10 or ISBN-13 (hyphens/spaces ignored), or None if
+    the text is not a well-formed ISBN. Both forms of the same book map to the same key.
+    """
+    if not text:
+        return None
+    isbn = text.replace('-', '').replace(' ', '').upper()
+    if len(isbn) == 13 and isbn.isdigit():
+        return isbn
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        core = "978" + isbn[:9]
+        check = (10 - sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core)) % 10) % 10
+        return core + str(check)
+    return None
+
+
+class IsbnCache:
+    """
+    SQLite-backed store of Open Library metadata (JSON) and cover images (bytes).
+    Entries expire after `ttl` seconds; when the total size exceeds `max_bytes` the least
+    recently used entries are evicted. Safe to share between threads.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 not_found_ttl=NOT_FOUND_TTL):
+        """
+        Args:
+            path (str): SQLite file to use (":memory:" for a throwaway cache).
+            ttl (float): Seconds an entry stays valid.
+            max_bytes (int): Size budget for all cached data.
+            not_found_ttl (float): Seconds a "not found" answer stays valid.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (
+                isbn TEXT PRIMARY KEY, data TEXT, expires_at REAL NOT NULL,
+                last_used REAL NOT NULL, size INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS covers (
+                isbn TEXT PRIMARY KEY, content_type TEXT, data BLOB NOT NULL, expires_at REAL NOT NULL,
+                last_used REAL NOT NULL, size INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_metadata_last_used ON metadata (last_used);
+            CREATE INDEX IF NOT EXISTS idx_covers_last_used ON covers (last_used);
+        """)
+
+    # --- Metadata ---
+    def get_metadata(self, isbn):
+        """
+        Returns the cached Open Library record for isbn: a dict, None if Open Library is known
+        to have no such book, or MISS if nothing (fresh) is cached.
+        """
+        row = self._get("metadata", "data", isbn)
+        if row is MISS:
+            return MISS
+        return json.loads(row[0])
+
+    def put_metadata(self, isbn, data):
+        """Stores an Open Library record (or None to remember that the ISBN was not found)."""
+        payload = json.dumps(data)
+        ttl = self.ttl if data is not None else self.not_found_ttl
+        self._put("INSERT OR REPLACE INTO metadata (isbn, data, expires_at, last_used, size) VALUES (?, ?, ?, ?, ?)",
+                  isbn, (payload,), ttl, len(payload))
+
+    # --- Covers ---
+    def get_cover(self, isbn):
+        """Returns (image_bytes, content_type) for a cached cover, or None."""
+        row = self._get("covers", "data, content_type", isbn)
+        if row is MISS:
+            return None
+        return bytes(row[0]), row[1]
+
+    def put_cover(self, isbn, data, content_type):
+        """Stores raw cover image bytes."""
+        self._put("INSERT OR REPLACE INTO covers (isbn, data, content_type, expires_at, last_used, size) VALUES (?, ?, ?, ?, ?, ?)",
+                  isbn, (sqlite3.Binary(data), content_type), self.ttl, len(data))
+
+    # --- Maintenance ---
+    def prewarm(self, isbns, fetch, progress=None):
+        """
+        Fetches and caches every ISBN in isbns that is not cached yet.
+        Args:
+            isbns (iterable): ISBN strings (any format normalize_isbn accepts; others are skipped).
+            fetch (callable): fetch(isbn) that looks the ISBN up and stores the result in this cache.
+            progress (callable): Optional progress(done, total) callback.
+        Returns:
+            int: Number of ISBNs that had to be fetched.
+        """
+        wanted = []
+        for text in isbns:
+            key = normalize_isbn(text.strip())
+            if key and key not in wanted:
+                wanted.append(key)
+        fetched = 0
+        for done, isbn in enumerate(wanted, 1):
+            if not self.contains(isbn):
+                fetch(isbn)
+                fetched += 1
+            if progress: progress(done, len(wanted))
+        return fetched
+
+    def stats(self):
+        """Returns hit/miss counters and the current number and size of entries."""
+        with self._lock:
+            meta_count, meta_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata").fetchone()
+            cover_count, cover_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM covers").fetchone()
+            return {'hits': self.hits, 'misses': self.misses, 'metadata': meta_count,
+                    'covers': cover_count, 'bytes': meta_bytes + cover_bytes}
+
+    def contains(self, isbn):
+        """True if fresh metadata for isbn is cached (does not count as a hit or refresh last_used)."""
+        with self._lock:
+            row = self._db.execute("SELECT expires_at FROM metadata WHERE isbn=?", (isbn,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM metadata")
+            self._db.execute("DELETE FROM covers")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Internal Helpers ---
+    def _get(self, table, columns, isbn):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(f"SELECT {columns}, expires_at FROM {table} WHERE isbn=?", (isbn,)).fetchone()
+            if row is None or row[-1] <= now:
+                if row is not None: # Expired
+                    self._db.execute(f"DELETE FROM {table} WHERE isbn=?", (isbn,))
+                self.misses += 1
+                return MISS
+            self._db.execute(f"UPDATE {table} SET last_used=? WHERE isbn=?", (now, isbn))
+            self.hits += 1
+            return row[:-1]
+
+    def _put(self, sql, isbn, values, ttl, size):
+        now = time.time()
+        with self._lock:
+            # Column order in every INSERT is: isbn, <values...>, expires_at, last_used, size
+            self._db.execute(sql, (isbn,) + tuple(values) + (now + ttl, now, size))
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        total = self._db.execute("SELECT (SELECT COALESCE(SUM(size), 0) FROM metadata) + "
+                                 "(SELECT COALESCE(SUM(size), 0) FROM covers)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        candidates = self._db.execute("SELECT 'metadata', isbn, size, last_used FROM metadata "
+                                      "UNION ALL SELECT 'covers', isbn, size, last_used FROM covers "
+                                      "ORDER BY last_used").fetchall()
+        for table, isbn, size, _ in candidates:
+            if total <= self.max_bytes:
+                break
+            self._db.execute(f"DELETE FROM {table} WHERE isbn=?", (isbn,))
+            total -= size
@@ -0,0 +1,583 @@
+# Data-access functions for the library tables. Each one takes an open connection, does its
+# queries and returns plain Python data. They run on worker threads, so none of them may
+# touch Tk widgets or show dialogs - the UI decides how to present the result.
+
+import datetime
+import time
+from collections import Counter
+from functools import partial
+import storage
+
+MAX_BORROW_LIMIT = 3
+DEADLOCK_RETRIES = 3     # Attempts for circulation transactions that lose a deadlock
+DEADLOCK_BACKOFF = 0.05  # Seconds; grows with each retry
+
+# Loans in the column order of customs.columns_1, with the book and student details joined in
+BORROW_COLUMNS = ("SELECT l.book_id, b.book_name, l.stu_roll, s.stu_name, s.course, s.subject, l.issue_date, l.return_date "
+                  "FROM loans l JOIN book_list b ON b.book_id = l.book_id JOIN students s ON s.stu_roll = l.stu_roll")
+
+OVERDUE_SCAN_KEY = 'overdue_scan' # library_meta row holding the Unix time of the last overdue scan
+OVERDUE_BATCH = 1000              # Overdue rows read and inserted per round trip during a scan
+EXPORT_BATCH = 5000               # Rows per fetch (and per written chunk) of an export
+
+# Outcomes of issue_book()
+ISSUED = "issued"
+BOOK_NOT_FOUND = "book_not_found"
+OUT_OF_STOCK = "out_of_stock"
+LIMIT_REACHED = "limit_reached"
+ALREADY_BORROWED = "already_borrowed"
+
+
+# --- Internal Helpers ---
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _add_qty(curs, deltas):
+    """
+    Adds deltas[book_id] to the qty of each book with one UPDATE. The rows are locked in
+    primary-key order, so concurrent batches cannot deadlock each other on book_list.
+    """
+    book_ids = sorted(deltas)
+    cases = " ".join(["WHEN %s THEN %s"] * len(book_ids))
+    curs.execute(f"UPDATE book_list SET qty = qty + CASE book_id {cases} ELSE 0 END "
+                 f"WHERE book_id IN ({_placeholders(book_ids)})",
+                 [arg for book_id in book_ids for arg in (book_id, deltas[book_id])] + book_ids)
+
+
+def _save_student(curs, stu_roll, stu_name, course, subject):
+    """
+    Adds the student or updates their details (a blank course/subject keeps the stored one)
+    and returns their active-loan count: a primary-key read that also locks the row until
+    commit/rollback, so concurrent issues to one student cannot both take the last slot.
+    """
+    curs.execute("""INSERT INTO students (stu_roll, stu_name, course, subject) VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE stu_name = VALUES(stu_name),
+                        course = COALESCE(VALUES(course), course), subject = COALESCE(VALUES(subject), subject)""",
+                 (stu_roll, stu_name, course or None, subject or None))
+    curs.execute("SELECT active_loans FROM students WHERE stu_roll=%s FOR UPDATE", (stu_roll,))
+    return curs.fetchone()[0]
+
+
+def _retry_on_deadlock(connection, transaction):
+    """
+    Runs transaction(), re-running it if the server picked it as a deadlock victim or a
+    lock wait timed out. The transaction is rolled back before each retry, so it starts clean.
+    """
+    for attempt in range(DEADLOCK_RETRIES):
+        try:
+            return transaction()
+        except storage.LockConflict:
+            if attempt == DEADLOCK_RETRIES - 1:
+                raise
+            connection.rollback()
+            time.sleep(DEADLOCK_BACKOFF * (attempt + 1))
+
+
+# --- Catalog ---
+def fetch_all_books(connection):
+    """Returns every book ordered by name."""
+    with connection.cursor() as curs:
+        curs.execute("SELECT * FROM book_list ORDER BY book_name")
+        return curs.fetchall()
+
+
+def fetch_catalog_version(connection):
+    """
+    Returns the catalog version (bumped by triggers on every book_list change), or None if
+    the database predates it (schema.py not run yet).
+    """
+    try:
+        with connection.cursor() as curs:
+            curs.execute("SELECT version FROM library_meta WHERE name = 'catalog'")
+            row = curs.fetchone()
+    except storage.DatabaseError:
+        connection.rollback() # Missing table; leave the connection usable
+        return None
+    return row[0] if row else None
+
+
+def fetch_catalog_snapshot(connection):
+    """
+    Reads the whole catalog for catalog_cache.CatalogCache.
+    Returns:
+        tuple: (catalog version or None, rows). The version is read first, so a change made
+               in between makes the version look old (a harmless extra reload), never new.
+    """
+    version = fetch_catalog_version(connection)
+    with connection.cursor() as curs:
+        curs.execute("SELECT book_id, book_name, author, edition, price, qty FROM book_list")
+        return version, curs.fetchall()
+
+
+def fetch_books_page(connection, after=None, before=None, limit=150):
+    """
+    Keyset pagination over the catalog in (book_name, book_id) order.
+    Args:
+        after (tuple): Return rows strictly after this (book_name, book_id) key.
+        before (tuple): Return rows strictly before this key (still returned in ascending order).
+        limit (int): Maximum number of rows.
+    Returns:
+        list: Rows of (book_id, book_name, author, edition, price, qty).
+    """
+    columns = "SELECT book_id, book_name, author, edition, price, qty FROM book_list"
+    with connection.cursor() as curs:
+        # The OR form (rather than a row comparison) lets MySQL seek on an index over (book_name, book_id)
+        if before is not None:
+            curs.execute(columns + " WHERE book_name < %s OR (book_name = %s AND book_id < %s)"
+                                   " ORDER BY book_name DESC, book_id DESC LIMIT %s",
+                         (before[0], before[0], before[1], limit))
+            return list(reversed(curs.fetchall()))
+        if after is not None:
+            curs.execute(columns + " WHERE book_name > %s OR (book_name = %s AND book_id > %s)"
+                                   " ORDER BY book_name, book_id LIMIT %s",
+                         (after[0], after[0], after[1], limit))
+        else:
+            curs.execute(columns + " ORDER BY book_name, book_id LIMIT %s", (limit,))
+        return list(curs.fetchall())
+
+
+def fetch_book_name(connection, book_id):
+    """Returns the name of the given book, or None if the ID does not exist."""
+    with connection.cursor() as curs:
+        curs.execute("SELECT book_name FROM book_list WHERE book_id=%s", (book_id,))
+        result = curs.fetchone()
+        return result[0] if result else None
+
+
+def add_book(connection, book_id, book_name, author, edition, price, qty):
+    """Inserts a new book. Returns False (and changes nothing) if the ID is already taken."""
+    with connection.cursor() as curs:
+        curs.execute("SELECT book_id FROM book_list WHERE book_id=%s", (book_id,))
+        if curs.fetchone():
+            return False
+        sql = "INSERT INTO book_list (book_id, book_name, author, edition, price, qty) VALUES (%s, %s, %s, %s, %s, %s)"
+        curs.execute(sql, (book_id, book_name, author or None, edition or None, price, qty)) # Empty author/edition stored as NULL
+    connection.commit()
+    return True
+
+
+def update_book(connection, book_id, book_name, author, edition, price, qty):
+    """
+    Updates a book's details. Returns 1 if the book exists (also when nothing changed), else 0.
+    The row is looked up and locked first, as MySQL's rowcount counts only changed rows.
+    """
+    connection.begin_write()
+    with connection.cursor() as curs:
+        curs.execute("SELECT 1 FROM book_list WHERE book_id=%s FOR UPDATE", (book_id,))
+        if curs.fetchone() is None:
+            connection.rollback()
+            return 0
+        sql = """UPDATE book_list SET book_name=%s, author=%s, edition=%s, price=%s, qty=%s
+                 WHERE book_id=%s"""
+        curs.execute(sql, (book_name, author or None, edition or None, price, qty, book_id))
+    connection.commit()
+    return 1
+
+
+def delete_book(connection, book_id):
+    """
+    Deletes a book unless someone is still borrowing it.
+    Returns:
+        int: Number of active borrows blocking the delete (0 means the book was deleted).
+    """
+    with connection.cursor() as curs:
+        curs.execute("SELECT COUNT(*) FROM loans WHERE book_id=%s", (book_id,))
+        borrow_count = curs.fetchone()[0]
+        if borrow_count > 0:
+            return borrow_count
+        curs.execute("DELETE FROM book_list WHERE book_id=%s", (book_id,))
+    connection.commit()
+    return 0
+
+
+def fetch_existing_book_ids(connection, book_ids, chunk_size=500):
+    """Returns the subset of book_ids that are already in book_list."""
+    book_ids = list(book_ids)
+    existing = set()
+    with connection.cursor() as curs:
+        for start in range(0, len(book_ids), chunk_size):
+            chunk = book_ids[start:start + chunk_size]
+            curs.execute("SELECT book_id FROM book_list WHERE book_id IN (" + ", ".join(["%s"] * len(chunk)) + ")", chunk)
+            existing.update(row[0] for row in curs.fetchall())
+    return existing
+
+
+def upsert_books(connection, rows, update_details=False, commit=True):
+    """
+    Inserts books in one batch; for IDs that already exist the quantity is increased.
+    Args:
+        rows (list): Tuples of (book_id, book_name, author, edition, price, qty).
+        update_details (bool): Also replace the name, author, edition and price of existing books.
+        commit (bool): False leaves the commit to the caller (to commit several batches at once).
+    Returns:
+        int: Number of rows sent.
+    """
+    if not rows:
+        return 0
+    with connection.cursor() as curs:
+        sql = """INSERT INTO book_list (book_id, book_name, author, edition, price, qty) VALUES (%s, %s, %s, %s, %s, %s)
+                 ON DUPLICATE KEY UPDATE qty = qty + VALUES(qty)"""
+        if update_details:
+            sql += ", book_name = VALUES(book_name), author = VALUES(author), edition = VALUES(edition), price = VALUES(price)"
+        curs.executemany(sql, [(book_id, book_name, author or None, edition or None, price, qty)
+                               for book_id, book_name, author, edition, price, qty in rows])
+    if commit:
+        connection.commit()
+    return len(rows)
+
+
+def add_copies(connection, copies):
+    """
+    Increases the stock of existing books in one batch.
+    Args:
+        copies (list): Tuples of (book_id, number of copies to add).
+    """
+    if not copies:
+        return
+    with connection.cursor() as curs:
+        curs.executemany("UPDATE book_list SET qty = qty + %s WHERE book_id=%s",
+                         [(count, book_id) for book_id, count in copies])
+    connection.commit()
+
+
+# --- Circulation ---
+def issue_book(connection, book_id, stu_roll, stu_name, course, subject, issue_date, return_date):
+    """
+    Issues a book to a student after checking stock, the borrow limit and duplicates, and
+    saves the student's details. Safe with several desks issuing at once: the stock is taken
+    with a conditional UPDATE (qty never goes below 0) and the student's row is locked while
+    their loan count is checked, so two transactions can never both take the last copy or the last slot.
+    Returns:
+        str: One of ISSUED, BOOK_NOT_FOUND, OUT_OF_STOCK, LIMIT_REACHED, ALREADY_BORROWED.
+    """
+    return _retry_on_deadlock(connection, partial(_issue_book_once, connection, book_id, stu_roll,
+                                                  stu_name, course, subject, issue_date, return_date))
+
+
+def _issue_book_once(connection, book_id, stu_roll, stu_name, course, subject, issue_date, return_date):
+    with connection.cursor() as curs:
+        # Take a copy; this also locks the book row until commit/rollback
+        if curs.execute("UPDATE book_list SET qty = qty - 1 WHERE book_id=%s AND qty > 0", (book_id,)) == 0:
+            curs.execute("SELECT 1 FROM book_list WHERE book_id=%s", (book_id,)) # Only on the failure path
+            outcome = OUT_OF_STOCK if curs.fetchone() else BOOK_NOT_FOUND
+            connection.rollback()
+            return outcome
+
+        # Borrow limit: the student's maintained loan count, read (and locked) by primary key
+        if _save_student(curs, stu_roll, stu_name, course, subject) >= MAX_BORROW_LIMIT:
+            connection.rollback()
+            return LIMIT_REACHED
+
+        try: # A trigger adds the loan to students.active_loans
+            curs.execute("INSERT INTO loans (stu_roll, book_id, issue_date, return_date) VALUES (%s, %s, %s, %s)",
+                         (stu_roll, book_id, issue_date, return_date))
+        except storage.DuplicateKeyError:
+            connection.rollback() # The unique (stu_roll, book_id) key caught a duplicate
+            return ALREADY_BORROWED
+    connection.commit() # Commit all changes
+    return ISSUED
+
+
+def fetch_borrow_records_for_student(connection, stu_roll):
+    """Returns the active borrow records of one student."""
+    with connection.cursor() as curs:
+        curs.execute(BORROW_COLUMNS + " WHERE l.stu_roll=%s", (stu_roll,))
+        return curs.fetchall()
+
+
+def fetch_all_borrow_records(connection):
+    """Returns every active borrow record ordered by student and issue date."""
+    with connection.cursor() as curs:
+        curs.execute(BORROW_COLUMNS + " ORDER BY l.stu_roll, l.issue_date")
+        return curs.fetchall()
+
+
+def return_book(connection, stu_roll, book_id):
+    """Deletes the loan and puts the copy back in stock. Returns False if no loan matched."""
+    return _retry_on_deadlock(connection, partial(_return_book_once, connection, stu_roll, book_id))
+
+
+def _return_book_once(connection, stu_roll, book_id):
+    with connection.cursor() as curs:
+        # Book row, student row, then the loan: the same lock order as issue_book, so the two cannot deadlock each other
+        curs.execute("UPDATE book_list SET qty = qty + 1 WHERE book_id=%s", (book_id,))
+        curs.execute("SELECT 1 FROM students WHERE stu_roll=%s FOR UPDATE", (stu_roll,))
+        deleted_count = curs.execute("DELETE FROM loans WHERE stu_roll=%s AND book_id=%s", (stu_roll, book_id))
+        if deleted_count == 0:
+            connection.rollback()
+            return False
+    connection.commit() # Commit both changes
+    return True
+
+
+def issue_books(connection, book_ids, stu_roll, stu_name, course, subject, issue_date, return_date):
+    """
+    Issues several books to one student in a single transaction (the desk's scan-to-queue),
+    applying issue_book's checks in queue order with a few batched statements.
+    Returns:
+        list: (book_id, outcome) for every requested book, outcome as for issue_book().
+              Only books with ISSUED were written; if none were, nothing is.
+    """
+    book_ids = [str(book_id) for book_id in book_ids]
+    if not book_ids:
+        return []
+    return _retry_on_deadlock(connection, partial(_issue_books_once, connection, book_ids, stu_roll, stu_name,
+                                                  course, subject, issue_date, return_date))
+
+
+def _issue_books_once(connection, book_ids, stu_roll, stu_name, course, subject, issue_date, return_date):
+    connection.begin_write()
+    with connection.cursor() as curs:
+        # Book rows, the student's row, then their loans: the same lock order as issue_book/return_book
+        distinct = sorted(set(book_ids))
+        curs.execute(f"SELECT book_id, qty FROM book_list WHERE book_id IN ({_placeholders(distinct)}) FOR UPDATE",
+                     distinct)
+        stock = {str(book_id): qty or 0 for book_id, qty in curs.fetchall()}
+        borrowed = _save_student(curs, stu_roll, stu_name, course, subject)
+        curs.execute("SELECT book_id FROM loans WHERE stu_roll=%s FOR UPDATE", (stu_roll,))
+        held = {str(row[0]) for row in curs.fetchall()}
+
+        outcomes, issued = [], []
+        for book_id in book_ids:
+            if book_id not in stock:
+                outcome = BOOK_NOT_FOUND
+            elif book_id in held:
+                outcome = ALREADY_BORROWED # Also a book scanned twice
+            elif stock[book_id] < 1:
+                outcome = OUT_OF_STOCK
+            elif borrowed >= MAX_BORROW_LIMIT:
+                outcome = LIMIT_REACHED
+            else:
+                outcome = ISSUED
+                held.add(book_id)
+                borrowed += 1
+                issued.append(book_id)
+            outcomes.append((book_id, outcome))
+        if not issued:
+            connection.rollback()
+            return outcomes
+
+        _add_qty(curs, {book_id: -1 for book_id in issued})
+        curs.executemany("INSERT INTO loans (stu_roll, book_id, issue_date, return_date) VALUES (%s, %s, %s, %s)",
+                         [(stu_roll, book_id, issue_date, return_date) for book_id in issued])
+    connection.commit()
+    return outcomes
+
+
+def return_books(connection, loans):
+    """
+    Returns several books in a single transaction (e.g. a stack dropped off at the end of
+    term): one UPDATE of book_list, one locking read of students, one SELECT and one DELETE of
+    loans, whatever the count.
+    Args:
+        loans (list): (stu_roll, book_id) pairs.
+    Returns:
+        list: The pairs that were returned; pairs without a borrow record are left out.
+    """
+    loans = list(dict.fromkeys((str(stu_roll), str(book_id)) for stu_roll, book_id in loans))
+    if not loans:
+        return []
+    return _retry_on_deadlock(connection, partial(_return_books_once, connection, loans))
+
+
+def _return_books_once(connection, loans):
+    by_roll = {}
+    for stu_roll, book_id in loans:
+        by_roll.setdefault(stu_roll, []).append(book_id)
+    # OR of "stu_roll = x AND book_id IN (...)" per student, so each part is a unique_borrow index range
+    where = " OR ".join(f"(stu_roll=%s AND book_id IN ({_placeholders(book_ids)}))" for book_ids in by_roll.values())
+    args = [arg for stu_roll, book_ids in by_roll.items() for arg in [stu_roll] + book_ids]
+    with connection.cursor() as curs:
+        # Book rows, student rows, then loans, as in issue_book; copies of loans that turn out to be missing are taken back below
+        _add_qty(curs, Counter(book_id for _, book_id in loans))
+        curs.execute(f"SELECT stu_roll FROM students WHERE stu_roll IN ({_placeholders(by_roll)}) FOR UPDATE",
+                     sorted(by_roll))
+        curs.execute(f"SELECT stu_roll, book_id FROM loans WHERE {where} FOR UPDATE", args)
+        found = {(str(stu_roll), str(book_id)) for stu_roll, book_id in curs.fetchall()}
+        if not found:
+            connection.rollback()
+            return []
+        missing = Counter(book_id for stu_roll, book_id in loans if (stu_roll, book_id) not in found)
+        if missing:
+            _add_qty(curs, {book_id: -count for book_id, count in missing.items()})
+        curs.execute(f"DELETE FROM loans WHERE {where}", args) # Triggers update students.active_loans
+    connection.commit()
+    return [loan for loan in loans if loan in found]
+
+
+def reissue_book(connection, book_id, stu_roll, new_return_date):
+    """
+    Moves the return date of an active loan. Returns False if there is no such loan (returned
+    already); re-issuing to the same date succeeds, although MySQL reports no changed row.
+    """
+    connection.begin_write()
+    with connection.cursor() as curs:
+        curs.execute("SELECT 1 FROM loans WHERE stu_roll=%s AND book_id=%s FOR UPDATE", (stu_roll, book_id))
+        if curs.fetchone() is None:
+            connection.rollback()
+            return False
+        curs.execute("UPDATE loans SET return_date=%s WHERE stu_roll=%s AND book_id=%s",
+                     (new_return_date, stu_roll, book_id))
+    connection.commit()
+    return True
+
+
+# --- Overdue Loans ---
+def refresh_overdue_summary(connection, reader, today, fine_per_day, min_interval=0):
+    """
+    Rebuilds overdue_summary from the loans due before `today`: one range scan on the
+    return_date index, streamed on `reader` (so the rows are never all in memory), and
+    batched inserts on `connection`, committed together.
+    Args:
+        reader: A second connection (e.g. from the same pool) for the streaming read, which
+            blocks its connection until it is finished; it is only read from.
+        today (datetime.date): Scan date; a book due yesterday is 1 day overdue.
+        fine_per_day (float): Fine per overdue day.
+        min_interval (float): Skip the scan if one (at any desk) finished less than this many seconds ago.
+    Returns:
+        int: Number of overdue loans, or None if the scan was skipped.
+    """
+    now = int(time.time())
+    connection.begin_write()
+    try:
+        with connection.cursor() as insert_curs:
+            # Locking the scan-time row makes scans started at several desks run one after another
+            insert_curs.execute("SELECT version FROM library_meta WHERE name = %s FOR UPDATE", (OVERDUE_SCAN_KEY,))
+            row = insert_curs.fetchone()
+            if row is not None and now - row[0] < min_interval:
+                connection.rollback()
+                return None
+            insert_curs.execute("DELETE FROM overdue_summary")
+        with reader.streaming_cursor() as curs, connection.cursor() as insert_curs:
+            count = _copy_overdue_rows(curs, insert_curs, today, fine_per_day)
+            insert_curs.execute("UPDATE library_meta SET version = %s WHERE name = %s", (now, OVERDUE_SCAN_KEY))
+        connection.commit()
+    except BaseException:
+        connection.rollback() # Releases the scan lock and restores the old list
+        raise
+    return count
+
+
+def _copy_overdue_rows(curs, insert_curs, today, fine_per_day):
+    """Streams the loans due before today from curs into overdue_summary, OVERDUE_BATCH rows at a time."""
+    curs.execute("SELECT l.stu_roll, l.book_id, b.book_name, s.stu_name, l.return_date FROM loans l "
+                 "JOIN book_list b ON b.book_id = l.book_id JOIN students s ON s.stu_roll = l.stu_roll "
+                 "WHERE l.return_date < %s", (today.isoformat(),))
+    count = 0
+    while True:
+        batch = curs.fetchmany(OVERDUE_BATCH)
+        if not batch:
+            break
+        rows = []
+        for stu_roll, book_id, book_name, stu_name, return_date in batch:
+            due = _as_date(return_date)
+            days = (today - due).days
+            rows.append((stu_roll, book_id, book_name, stu_name, due.isoformat(), days, round(days * fine_per_day, 2)))
+        insert_curs.executemany("""INSERT INTO overdue_summary
+                                   (stu_roll, book_id, book_name, stu_name, return_date, days_overdue, fine)
+                                   VALUES (%s, %s, %s, %s, %s, %s, %s)""", rows)
+        count += len(rows)
+    return count
+
+
+def fetch_overdue_summary(connection, limit=500):
+    """
+    Reads the materialized overdue list; cost depends on the number of overdue loans only.
+    Returns:
+        dict: scanned_at (Unix time of the last scan, or None), count, students, fines
+              (totals over all overdue loans) and rows (book_id, book_name, stu_roll, stu_name,
+              return_date, days_overdue, fine), most overdue first, at most `limit`.
+    """
+    with connection.cursor() as curs:
+        curs.execute("SELECT version FROM library_meta WHERE name = %s", (OVERDUE_SCAN_KEY,))
+        row = curs.fetchone()
+        scanned_at = row[0] if row and row[0] else None
+        curs.execute("SELECT COUNT(*), COUNT(DISTINCT stu_roll), COALESCE(SUM(fine), 0) FROM overdue_summary")
+        count, students, fines = curs.fetchone()
+        curs.execute("""SELECT book_id, book_name, stu_roll, stu_name, return_date, days_overdue, fine
+                        FROM overdue_summary ORDER BY days_overdue DESC, stu_roll, book_id LIMIT %s""", (limit,))
+        rows = curs.fetchall()
+    return {'scanned_at': scanned_at, 'count': count, 'students': students, 'fines': fines, 'rows': rows}
+
+
+# --- Circulation Analytics ---
+def fetch_circulation_dashboard(connection, since, limit=10):
+    """
+    Reads the daily rollups (schema migration 5) from `since` on; cost depends on the number
+    of days and of books/courses/subjects with loans in them, never on the loan history.
+    Args:
+        since (str): First day included, YYYY-MM-DD.
+        limit (int): Rows per list.
+    Returns:
+        dict: totals (issued, returned, reissued, stockouts) and the lists top_books (book_id,
+              book_name, issued, returned, reissued), by_course and by_subject (name, issued,
+              returned, reissued; '' = not given) and stockouts (book_id, book_name, times
+              run out, last day run out, qty now), busiest first.
+    """
+    with connection.cursor() as curs:
+        curs.execute("""SELECT COALESCE(SUM(issued), 0), COALESCE(SUM(returned), 0), COALESCE(SUM(reissued), 0),
+                               COALESCE(SUM(stockouts), 0) FROM loan_daily_book WHERE day >= %s""", (since,))
+        issued, returned, reissued, stockouts = curs.fetchone()
+        curs.execute("""SELECT d.book_id, b.book_name, d.issued, d.returned, d.reissued FROM (
+                            SELECT book_id, SUM(issued) AS issued, SUM(returned) AS returned, SUM(reissued) AS reissued
+                            FROM loan_daily_book WHERE day >= %s GROUP BY book_id
+                        ) d LEFT JOIN book_list b ON b.book_id = d.book_id
+                        WHERE d.issued > 0 ORDER BY d.issued DESC, d.book_id LIMIT %s""", (since, limit))
+        top_books = curs.fetchall()
+        by_group = {}
+        for table, key in (('loan_daily_course', 'course'), ('loan_daily_subject', 'subject')):
+            curs.execute(f"""SELECT {key}, SUM(issued) AS issued, SUM(returned), SUM(reissued) FROM {table}
+                             WHERE day >= %s GROUP BY {key} ORDER BY issued DESC, {key} LIMIT %s""", (since, limit))
+            by_group[key] = curs.fetchall()
+        curs.execute("""SELECT d.book_id, b.book_name, d.times, d.last_day, b.qty FROM (
+                            SELECT book_id, SUM(stockouts) AS times, MAX(day) AS last_day
+                            FROM loan_daily_book WHERE day >= %s AND stockouts > 0 GROUP BY book_id
+                        ) d LEFT JOIN book_list b ON b.book_id = d.book_id
+                        ORDER BY d.times DESC, d.last_day DESC, d.book_id LIMIT %s""", (since, limit))
+        stockout_rows = curs.fetchall()
+    return {'totals': {'issued': issued, 'returned': returned, 'reissued': reissued, 'stockouts': stockouts},
+            'top_books': top_books, 'by_course': by_group['course'], 'by_subject': by_group['subject'],
+            'stockouts': stockout_rows}
+
+
+# --- Export ---
+# What export.py can write: name -> (column names, column types, row query, count query).
+# Types are "str", "number", "int" and "date"; rows come in primary-key order.
+EXPORTS = {
+    'books': (('book_id', 'book_name', 'author', 'edition', 'price', 'qty'),
+              ('str', 'str', 'str', 'str', 'number', 'int'),
+              "SELECT book_id, book_name, author, edition, price, qty FROM book_list ORDER BY book_id",
+              "SELECT COUNT(*) FROM book_list"),
+    'loans': (('book_id', 'book_name', 'stu_roll', 'stu_name', 'course', 'subject', 'issue_date', 'return_date'),
+              ('str', 'str', 'str', 'str', 'str', 'str', 'date', 'date'),
+              BORROW_COLUMNS + " ORDER BY l.stu_roll, l.book_id",
+              "SELECT COUNT(*) FROM loans"),
+}
+
+
+def count_export_rows(connection, name):
+    """Returns the number of rows the named export will write."""
+    with connection.cursor() as curs:
+        curs.execute(EXPORTS[name][3])
+        return curs.fetchone()[0]
+
+
+def stream_export_rows(connection, name, chunk_size=EXPORT_BATCH):
+    """
+    Yields the rows of the named export in lists of up to chunk_size, read through a
+    streaming cursor, so only one chunk is held in memory at a time. The connection is busy
+    until the generator is exhausted or closed.
+    """
+    with connection.streaming_cursor() as curs:
+        curs.execute(EXPORTS[name][2])
+        while True:
+            rows = curs.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+
+def _as_date(value):
+    """DATE columns come back as datetime.date from MySQL and as 'YYYY-MM-DD' text from SQLite."""
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value)[:10])
@@ -0,0 +1,182 @@
+# Open Library lookups used by the Add Book form. Book records and cover images go through
+# an IsbnCache first, so only ISBNs that were never seen before (or whose entry expired) cost
+# a network round trip.
+#
+# The cache can be filled ahead of time from a file with one ISBN per line:
+#     python openlibrary.py prewarm isbns.txt
+#     python openlibrary.py stats
+
+import sys
+import threading
+from isbn_cache import IsbnCache, MISS, normalize_isbn
+
+API_URL = "https://openlibrary.org/api/books"
+MAX_BIBKEYS = 50 # ISBNs per batched request (keeps the URL well under server limits)
+COVER_CHUNK_SIZE = 16 * 1024          # Cover downloads are read in chunks so they can be abandoned midway
+MAX_COVER_BYTES = 5 * 1024 * 1024     # Larger "covers" are refused rather than held in memory
+
+
+def parse_book_details(book_data):
+    """
+    Extracts the form fields from an Open Library "jscmd=data" record.
+    Returns:
+        dict: title, authors, edition (publishers and publish date) and cover_url (or None).
+    """
+    title = book_data.get("title", "N/A")
+    authors_list = book_data.get("authors", [])
+    authors_str = ", ".join([author.get("name", "") for author in authors_list if author.get("name")]) or "N/A"
+    publishers_list = book_data.get("publishers", [])
+    publishers_str = ", ".join([pub.get("name", "") for pub in publishers_list if pub.get("name")])
+    publish_date = book_data.get("publish_date", "")
+    edition_str = f"{publishers_str}, {publish_date}".strip(', ') or "N/A"
+
+    # Prefer medium or large covers if available, fall back to small
+    cover = book_data.get("cover") or {}
+    cover_url = cover.get("medium") or cover.get("large") or cover.get("small")
+    return {'title': title, 'authors': authors_str, 'edition': edition_str, 'cover_url': cover_url}
+
+
+class OpenLibraryClient:
+    """Fetches book records and covers from Open Library, reading and filling an IsbnCache."""
+    def __init__(self, cache=None, base_url=API_URL, timeout=15, cover_timeout=10):
+        """
+        Args:
+            cache (IsbnCache): Cache to use, or None to always go to the network.
+            base_url (str): Books API endpoint (overridable for a local mirror or test server).
+            timeout (float): Seconds to wait for a book record.
+            cover_timeout (float): Seconds to wait for a cover image.
+        """
+        self.cache = cache
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cover_timeout = cover_timeout
+        self._local = threading.local() # One requests.Session per thread (sessions are not thread-safe)
+
+    def session(self):
+        """Returns this thread's HTTP session, so repeated requests reuse a kept-alive connection."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests # Deferred until the first lookup, so the app starts without it
+            session = self._local.session = requests.Session()
+        return session
+
+    def fetch_book(self, isbn):
+        """
+        Looks up one ISBN.
+        Returns:
+            tuple: (record dict or None if Open Library has no such book, True if served from cache)
+        Raises:
+            requests.exceptions.RequestException, ValueError: On network errors or a bad response.
+        """
+        key = normalize_isbn(isbn) or isbn
+        if self.cache is not None:
+            cached = self.cache.get_metadata(key)
+            if cached is not MISS:
+                return cached, True
+
+        book_data = self._request_books([isbn])[isbn]
+        if self.cache is not None:
+            self.cache.put_metadata(key, book_data)
+        return book_data, False
+
+    def fetch_books(self, isbns):
+        """
+        Looks up several ISBNs with a single request for all of them that are not cached.
+        Args:
+            isbns (list): Up to MAX_BIBKEYS ISBN strings.
+        Returns:
+            dict: ISBN (as given) -> record dict, or None if Open Library has no such book.
+        Raises:
+            requests.exceptions.RequestException, ValueError: On network errors or a bad response.
+        """
+        results, missing = {}, []
+        for isbn in isbns:
+            cached = self.cache.get_metadata(normalize_isbn(isbn) or isbn) if self.cache is not None else MISS
+            if cached is MISS:
+                missing.append(isbn)
+            else:
+                results[isbn] = cached
+        if missing:
+            fetched = self._request_books(missing)
+            for isbn, book_data in fetched.items():
+                if self.cache is not None:
+                    self.cache.put_metadata(normalize_isbn(isbn) or isbn, book_data)
+            results.update(fetched)
+        return results
+
+    def fetch_cover(self, isbn, cover_url, cancelled=None):
+        """
+        Downloads (or reads from cache) the cover image of a book. The download is streamed
+        in chunks and stops early if cancelled() turns true.
+        Returns:
+            tuple: (image bytes, or None if cancelled; True if served from cache)
+        Raises:
+            requests.exceptions.RequestException: If the download failed.
+            ValueError: If the URL did not return an image or it is too large.
+        """
+        key = normalize_isbn(isbn) or isbn
+        if self.cache is not None:
+            cached = self.cache.get_cover(key)
+            if cached is not None:
+                return cached[0], True
+
+        with self.session().get(cover_url, timeout=self.cover_timeout, stream=True) as img_response:
+            img_response.raise_for_status()
+            content_type = img_response.headers.get('content-type')
+            if not content_type or not content_type.lower().startswith('image/'):
+                raise ValueError(f"URL did not return an image (Content-Type: {content_type})")
+            image_data = bytearray()
+            for chunk in img_response.iter_content(COVER_CHUNK_SIZE):
+                if cancelled is not None and cancelled():
+                    return None, False
+                image_data += chunk
+                if len(image_data) > MAX_COVER_BYTES:
+                    raise ValueError("Cover image is too large.")
+        image_data = bytes(image_data)
+        if self.cache is not None:
+            self.cache.put_cover(key, image_data, content_type)
+        return image_data, False
+
+    def prewarm(self, isbns, with_covers=True, progress=None):
+        """
+        Caches the records (and covers) of every ISBN in isbns that is not cached yet.
+        Lookups that fail are skipped so one bad line does not stop the run.
+        Returns:
+            int: Number of ISBNs fetched from the network.
+        """
+        if self.cache is None:
+            raise ValueError("prewarm needs a cache.")
+        import requests
+
+        def fetch(isbn):
+            try:
+                book_data, _ = self.fetch_book(isbn)
+                cover_url = parse_book_details(book_data)['cover_url'] if book_data else None
+                if with_covers and cover_url:
+                    self.fetch_cover(isbn, cover_url)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Could not prewarm ISBN {isbn}: {e}")
+
+        return self.cache.prewarm(isbns, fetch, progress=progress)
+
+    # --- Internal Helpers ---
+    def _request_books(self, isbns):
+        """One Books API call for all isbns; returns ISBN -> record (None when not found)."""
+        response = self.session().get(self.base_url, timeout=self.timeout,
+                                      params={'bibkeys': ",".join(f"ISBN:{isbn}" for isbn in isbns),
+                                              'format': 'json', 'jscmd': 'data'})
+        response.raise_for_status()
+        data = response.json()
+        return {isbn: data.get(f"ISBN:{isbn}") or None for isbn in isbns}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "prewarm":
+        client = OpenLibraryClient(IsbnCache())
+        with open(sys.argv[2], encoding="utf-8") as isbn_file:
+            fetched = client.prewarm(isbn_file, progress=lambda done, total: print(f"\r{done}/{total}", end=""))
+        print(f"\nFetched {fetched} new ISBN(s). Cache: {client.cache.stats()}")
+    elif len(sys.argv) == 2 and sys.argv[1] == "stats":
+        print(IsbnCache().stats())
+    else:
+        print("Usage: python openlibrary.py prewarm <isbn_file> | stats")
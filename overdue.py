@@ -0,0 +1,60 @@
+# Loan dates for the Issue and Re-Issue forms. Dates are typed as YYYY-MM-DD and stored in
+# DATE columns, so they are checked here before anything is written; a mistyped date would
+# otherwise either be rejected by the database or silently make a loan overdue (or never due).
+# The overdue list itself is built by library_db.refresh_overdue_summary.
+
+import datetime
+
+DATE_FORMAT = "%Y-%m-%d"
+MAX_LOAN_DAYS = 366   # A return date further out than this is taken to be a typo
+
+
+def parse_date(text, label="Date"):
+    """
+    Parses a YYYY-MM-DD date.
+    Raises:
+        ValueError: With a message that can be shown to the user as is.
+    """
+    try:
+        return datetime.datetime.strptime(text.strip(), DATE_FORMAT).date()
+    except ValueError:
+        raise ValueError(f"{label} must be a real date in YYYY-MM-DD form (got '{text}').") from None
+
+
+def check_loan_dates(issue_text, return_text, today=None):
+    """
+    Validates the dates of a new loan.
+    Returns:
+        tuple: (issue date, return date) as datetime.date.
+    Raises:
+        ValueError: If a date is malformed or the period makes no sense.
+    """
+    today = today or datetime.date.today()
+    issue_date = parse_date(issue_text, "Issue date")
+    return_date = parse_date(return_text, "Return date")
+    if issue_date > today:
+        raise ValueError("Issue date cannot be in the future.")
+    if return_date < issue_date:
+        raise ValueError("Return date cannot be before the issue date.")
+    if (return_date - issue_date).days > MAX_LOAN_DAYS:
+        raise ValueError(f"Loans can last at most {MAX_LOAN_DAYS} days.")
+    return issue_date, return_date
+
+
+def check_new_return_date(text, issue_text=None, today=None):
+    """
+    Validates the new return date of a re-issue.
+    Returns:
+        datetime.date: The new return date.
+    Raises:
+        ValueError: If it is malformed, in the past or too far from the issue date.
+    """
+    today = today or datetime.date.today()
+    new_date = parse_date(text, "New return date")
+    if new_date < today:
+        raise ValueError("The new return date is in the past.")
+    if issue_text:
+        issue_date = parse_date(str(issue_text), "Issue date")
+        if (new_date - issue_date).days > MAX_LOAN_DAYS:
+            raise ValueError(f"Loans can last at most {MAX_LOAN_DAYS} days from the issue date.")
+    return new_date
@@ -0,0 +1,539 @@
+# Database schema: creates the library tables on a fresh database and upgrades an existing
+# one in place. Migrations are numbered and applied in order; the highest applied number is
+# kept in the schema_version table, so running this again only applies what is new.
+# Both storage backends get the same tables and indexes (SQLite databases are always
+# created here, so only MySQL ever needs the in-place upgrade of hand-made tables).
+#
+#     python schema.py    (uses the settings in credentials.py)
+
+import storage
+
+CREATE_BOOK_LIST = """
+CREATE TABLE IF NOT EXISTS book_list (
+    book_id VARCHAR(50) PRIMARY KEY,
+    book_name VARCHAR(255) NOT NULL,
+    author VARCHAR(512),
+    edition VARCHAR(255),
+    price DECIMAL(10, 2) DEFAULT 0.00,
+    qty INT DEFAULT 0,
+    KEY idx_book_name (book_name, book_id),
+    CONSTRAINT chk_book_qty CHECK (qty >= 0)
+) ENGINE=InnoDB"""
+
+CREATE_BORROW_RECORD = """
+CREATE TABLE IF NOT EXISTS borrow_record (
+    book_id VARCHAR(50) NOT NULL,
+    book_name VARCHAR(255),
+    stu_roll VARCHAR(50) NOT NULL,
+    stu_name VARCHAR(255),
+    course VARCHAR(100),
+    subject VARCHAR(100),
+    issue_date DATE NOT NULL,
+    return_date DATE NOT NULL,
+    UNIQUE KEY unique_borrow (stu_roll, book_id),
+    KEY idx_borrow_book (book_id),
+    KEY idx_borrow_roll_issue (stu_roll, issue_date),
+    CONSTRAINT fk_borrow_book FOREIGN KEY (book_id) REFERENCES book_list (book_id)
+        ON DELETE RESTRICT ON UPDATE CASCADE
+) ENGINE=InnoDB"""
+
+SQLITE_CREATE_BOOK_LIST = """
+CREATE TABLE IF NOT EXISTS book_list (
+    book_id TEXT PRIMARY KEY,
+    book_name TEXT NOT NULL,
+    author TEXT,
+    edition TEXT,
+    price NUMERIC DEFAULT 0.00,
+    qty INTEGER DEFAULT 0 CONSTRAINT chk_book_qty CHECK (qty >= 0)
+)"""
+
+SQLITE_CREATE_BORROW_RECORD = """
+CREATE TABLE IF NOT EXISTS borrow_record (
+    book_id TEXT NOT NULL REFERENCES book_list (book_id) ON DELETE RESTRICT ON UPDATE CASCADE,
+    book_name TEXT,
+    stu_roll TEXT NOT NULL,
+    stu_name TEXT,
+    course TEXT,
+    subject TEXT,
+    issue_date DATE NOT NULL,
+    return_date DATE NOT NULL
+)"""
+
+# Normalized circulation (migration 4): one row per student, holding their details and a count of
+# their active loans (kept by triggers on loans), and one narrow row per loan. Book and student
+# names are joined in when read, so renaming either is a single-row update.
+CREATE_STUDENTS = """
+CREATE TABLE IF NOT EXISTS students (
+    stu_roll VARCHAR(50) PRIMARY KEY,
+    stu_name VARCHAR(255) NOT NULL,
+    course VARCHAR(100),
+    subject VARCHAR(100),
+    active_loans INT NOT NULL DEFAULT 0,
+    CONSTRAINT chk_active_loans CHECK (active_loans >= 0)
+)"""
+
+CREATE_LOANS = """
+CREATE TABLE IF NOT EXISTS loans (
+    stu_roll VARCHAR(50) NOT NULL,
+    book_id VARCHAR(50) NOT NULL,
+    issue_date DATE NOT NULL,
+    return_date DATE NOT NULL,
+    UNIQUE KEY unique_loan (stu_roll, book_id),
+    KEY idx_loans_book (book_id),
+    KEY idx_loans_roll_issue (stu_roll, issue_date),
+    KEY idx_loans_return (return_date),
+    CONSTRAINT fk_loans_book FOREIGN KEY (book_id) REFERENCES book_list (book_id)
+        ON DELETE RESTRICT ON UPDATE CASCADE,
+    CONSTRAINT fk_loans_student FOREIGN KEY (stu_roll) REFERENCES students (stu_roll)
+        ON DELETE RESTRICT ON UPDATE CASCADE
+)"""
+
+SQLITE_CREATE_STUDENTS = """
+CREATE TABLE IF NOT EXISTS students (
+    stu_roll TEXT PRIMARY KEY,
+    stu_name TEXT NOT NULL,
+    course TEXT,
+    subject TEXT,
+    active_loans INTEGER NOT NULL DEFAULT 0 CONSTRAINT chk_active_loans CHECK (active_loans >= 0)
+)"""
+
+SQLITE_CREATE_LOANS = """
+CREATE TABLE IF NOT EXISTS loans (
+    stu_roll TEXT NOT NULL REFERENCES students (stu_roll) ON DELETE RESTRICT ON UPDATE CASCADE,
+    book_id TEXT NOT NULL REFERENCES book_list (book_id) ON DELETE RESTRICT ON UPDATE CASCADE,
+    issue_date DATE NOT NULL,
+    return_date DATE NOT NULL
+)"""
+
+# Change counters other processes poll to notice edits (catalog_cache.py uses 'catalog')
+CREATE_LIBRARY_META = """
+CREATE TABLE IF NOT EXISTS library_meta (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+)"""
+
+# Every changed book_list row bumps the catalog version, whoever made the change
+CATALOG_TRIGGER_EVENTS = ('INSERT', 'UPDATE', 'DELETE')
+BUMP_CATALOG_VERSION = "UPDATE library_meta SET version = version + 1 WHERE name = 'catalog'"
+
+# Overdue loans as of the last scan (see library_db.refresh_overdue_summary); screens read this
+# instead of scanning borrow_record. Returns and re-issues remove their row via triggers.
+CREATE_OVERDUE_SUMMARY = """
+CREATE TABLE IF NOT EXISTS overdue_summary (
+    stu_roll VARCHAR(50) NOT NULL,
+    book_id VARCHAR(50) NOT NULL,
+    book_name VARCHAR(255),
+    stu_name VARCHAR(255),
+    return_date DATE NOT NULL,
+    days_overdue INT NOT NULL,
+    fine DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (stu_roll, book_id)
+)"""
+
+# Triggers keeping overdue_summary in step between scans: (name, event, statement); migration 4
+# moves them from borrow_record to loans
+OVERDUE_TRIGGERS = [
+    ('trg_borrow_record_delete_overdue', 'DELETE',
+     "DELETE FROM overdue_summary WHERE stu_roll = OLD.stu_roll AND book_id = OLD.book_id"),
+    ('trg_borrow_record_update_overdue', 'UPDATE',
+     "DELETE FROM overdue_summary WHERE stu_roll = OLD.stu_roll AND book_id = OLD.book_id "
+     "AND OLD.return_date <> NEW.return_date"),
+]
+LOAN_OVERDUE_TRIGGERS = [(name.replace('borrow_record', 'loans'), event, statement)
+                         for name, event, statement in OVERDUE_TRIGGERS]
+
+# loans triggers keeping students.active_loans equal to the student's number of loans
+ACTIVE_LOAN_TRIGGERS = [
+    ('trg_loans_insert_count', 'INSERT',
+     "UPDATE students SET active_loans = active_loans + 1 WHERE stu_roll = NEW.stu_roll"),
+    ('trg_loans_delete_count', 'DELETE',
+     "UPDATE students SET active_loans = active_loans - 1 WHERE stu_roll = OLD.stu_roll"),
+]
+
+# Loan history (migration 5): triggers on loans append an event for every issue, return and
+# re-issue, and triggers on loan_events add each event to daily rollups per book, course and
+# subject, so the Dashboard reads a few small rollup rows instead of grouping the history.
+# stock_left is the book's qty right after an issue (NULL otherwise); 0 means it ran out.
+CREATE_LOAN_EVENTS = """
+CREATE TABLE IF NOT EXISTS loan_events (
+    event_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    event_date DATE NOT NULL,
+    event_type VARCHAR(10) NOT NULL,
+    book_id VARCHAR(50) NOT NULL,
+    stu_roll VARCHAR(50) NOT NULL,
+    course VARCHAR(100),
+    subject VARCHAR(100),
+    due_date DATE,
+    stock_left INT,
+    KEY idx_events_book (book_id, event_date),
+    KEY idx_events_roll (stu_roll, event_date)
+)"""
+
+SQLITE_CREATE_LOAN_EVENTS = """
+CREATE TABLE IF NOT EXISTS loan_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_date DATE NOT NULL,
+    event_type TEXT NOT NULL,
+    book_id TEXT NOT NULL,
+    stu_roll TEXT NOT NULL,
+    course TEXT,
+    subject TEXT,
+    due_date DATE,
+    stock_left INTEGER
+)"""
+
+# Daily rollups: table -> (key column, its type, the loan_events expression filling it)
+LOAN_ROLLUPS = {
+    'loan_daily_book': ('book_id', 'VARCHAR(50)', "NEW.book_id"),
+    'loan_daily_course': ('course', 'VARCHAR(100)', "COALESCE(NEW.course, '')"),   # '' = no course given
+    'loan_daily_subject': ('subject', 'VARCHAR(100)', "COALESCE(NEW.subject, '')"),
+}
+ROLLUP_COUNTS = ('issued', 'returned', 'reissued', 'stockouts') # Counter columns of every rollup table
+
+# Date of a live event: the server's local date
+TODAY = {'mysql': "CURRENT_DATE", 'sqlite': "date('now', 'localtime')"}
+
+# loans triggers writing loan_events: (name, event, event_type, row, extra condition); {today} is the dialect's TODAY
+LOAN_EVENT_TRIGGERS = [
+    ('trg_loans_insert_event', 'INSERT', 'issue', 'NEW', ""),
+    ('trg_loans_delete_event', 'DELETE', 'return', 'OLD', ""),
+    ('trg_loans_update_event', 'UPDATE', 'reissue', 'NEW', " AND OLD.return_date <> NEW.return_date"),
+]
+
+# Indexes every database must have: table -> [(name, columns, unique)]
+REQUIRED_INDEXES = {
+    'book_list': [
+        ('idx_book_name', ('book_name', 'book_id'), False),         # ORDER BY book_name + keyset pages
+    ],
+    'borrow_record': [
+        ('unique_borrow', ('stu_roll', 'book_id'), True),           # One copy per student; issue-time lock
+        ('idx_borrow_book', ('book_id',), False),                   # Delete check, foreign key
+        ('idx_borrow_roll_issue', ('stu_roll', 'issue_date'), False), # Book Holders listing order
+        ('idx_borrow_return', ('return_date',), False),             # Overdue range scan (return_date < today)
+    ],
+    'overdue_summary': [
+        ('idx_overdue_days', ('days_overdue',), False),             # Overdue screen, most overdue first
+    ],
+    'loans': [
+        ('unique_loan', ('stu_roll', 'book_id'), True),             # One copy per student
+        ('idx_loans_book', ('book_id',), False),                    # Delete check, foreign key
+        ('idx_loans_roll_issue', ('stu_roll', 'issue_date'), False), # Book Holders listing order
+        ('idx_loans_return', ('return_date',), False),              # Overdue range scan (return_date < today)
+    ],
+    'loan_events': [
+        ('idx_events_book', ('book_id', 'event_date'), False),      # A book's history
+        ('idx_events_roll', ('stu_roll', 'event_date'), False),     # A student's history
+    ],
+}
+
+
+class SchemaError(Exception):
+    """The database cannot be upgraded automatically (e.g. existing rows violate a new constraint)."""
+
+
+def current_version(connection):
+    """Returns the number of the last applied migration (0 for a database never set up by this module)."""
+    with connection.cursor() as curs:
+        curs.execute("CREATE TABLE IF NOT EXISTS schema_version (version INT NOT NULL)" + _table_options(connection))
+        curs.execute("SELECT MAX(version) FROM schema_version")
+        version = curs.fetchone()[0]
+    return version or 0
+
+
+def upgrade(connection):
+    """
+    Applies every pending migration.
+    Returns:
+        list: Descriptions of the migrations that were applied (empty if already up to date).
+    Raises:
+        SchemaError: If existing data must be fixed by hand first; nothing of that migration is applied.
+    """
+    applied = []
+    version = current_version(connection)
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        migrate(connection)
+        with connection.cursor() as curs:
+            curs.execute("DELETE FROM schema_version")
+            curs.execute("INSERT INTO schema_version (version) VALUES (%s)", (number,))
+        connection.commit()
+        applied.append(f"{number}: {description}")
+    return applied
+
+
+# --- Migrations ---
+def _migrate_base_tables(connection):
+    """Creates both tables, or brings hand-made ones up to the same indexes, DATE columns and CHECK."""
+    if connection.dialect == "sqlite":
+        with connection.cursor() as curs:
+            curs.execute(SQLITE_CREATE_BOOK_LIST)
+            curs.execute(SQLITE_CREATE_BORROW_RECORD)
+        _create_missing_indexes(connection, ('book_list', 'borrow_record'))
+        return
+
+    with connection.cursor() as curs:
+        curs.execute(CREATE_BOOK_LIST)
+        curs.execute(CREATE_BORROW_RECORD)
+
+    # Tables that already existed: check the data first, then one ALTER per table (one rebuild each)
+    _check_data(connection)
+    for table in ('book_list', 'borrow_record'):
+        wanted = REQUIRED_INDEXES[table]
+        existing = _existing_indexes(connection, table)
+        clauses, drops = [], []
+        for name, columns, unique in wanted:
+            if name in existing and existing[name] != (columns, unique):
+                del existing[name] # Same name, other columns (e.g. the old (book_id, stu_roll) key)
+                drops.append(f"DROP INDEX {name}")
+        for name, columns, unique in wanted:
+            if any(cols[:len(columns)] == columns and (is_unique or not unique) for cols, is_unique in existing.values()):
+                continue # Covered by an existing index (possibly under another name)
+            clauses.append(f"ADD {'UNIQUE ' if unique else ''}INDEX {name} ({', '.join(columns)})")
+            existing[name] = (columns, unique)
+        clauses += drops # After the ADDs, so the foreign key always has an index on book_id
+        if table == 'borrow_record':
+            for column in ('issue_date', 'return_date'):
+                if _column_type(connection, table, column) != 'date':
+                    clauses.append(f"MODIFY {column} DATE NOT NULL")
+        if table == 'book_list' and _supports_check_constraints(connection) and \
+                'chk_book_qty' not in _check_constraints(connection, table):
+            clauses.append("ADD CONSTRAINT chk_book_qty CHECK (qty >= 0)")
+        if clauses:
+            with connection.cursor() as curs:
+                curs.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+
+
+def _migrate_catalog_version(connection):
+    """Adds library_meta and the book_list triggers that keep its catalog version up to date."""
+    with connection.cursor() as curs:
+        curs.execute(CREATE_LIBRARY_META + _table_options(connection))
+        curs.execute("SELECT COUNT(*) FROM library_meta WHERE name = 'catalog'")
+        if not curs.fetchone()[0]:
+            curs.execute("INSERT INTO library_meta (name, version) VALUES ('catalog', 0)")
+        for event in CATALOG_TRIGGER_EVENTS:
+            _create_trigger(connection, curs, f"trg_book_list_{event.lower()}_version", event, 'book_list',
+                            BUMP_CATALOG_VERSION)
+
+
+def _migrate_overdue_summary(connection):
+    """Adds the return_date index, the overdue_summary table, its scan-time row and its triggers."""
+    with connection.cursor() as curs:
+        curs.execute(CREATE_OVERDUE_SUMMARY + _table_options(connection))
+        curs.execute("SELECT COUNT(*) FROM library_meta WHERE name = 'overdue_scan'")
+        if not curs.fetchone()[0]:
+            curs.execute("INSERT INTO library_meta (name, version) VALUES ('overdue_scan', 0)")
+        for name, event, statement in OVERDUE_TRIGGERS:
+            _create_trigger(connection, curs, name, event, 'borrow_record', statement)
+    _create_missing_indexes(connection, ('borrow_record', 'overdue_summary'))
+
+
+def _migrate_students_and_loans(connection):
+    """
+    Replaces borrow_record with students and loans: copies each student (with the name, course
+    and subject of their loans) and each loan, sets the active-loan counts, moves the overdue
+    triggers and drops borrow_record. Safe to re-run if it was interrupted (MySQL DDL commits).
+    """
+    mysql = connection.dialect == "mysql"
+    if _table_exists(connection, 'borrow_record'):
+        _check_data(connection, borrow_books_only=True) # Before the DDL, which MySQL commits at once
+    with connection.cursor() as curs:
+        curs.execute(CREATE_STUDENTS + _table_options(connection) if mysql else SQLITE_CREATE_STUDENTS)
+        curs.execute(CREATE_LOANS + _table_options(connection) if mysql else SQLITE_CREATE_LOANS)
+    if not mysql:
+        _create_missing_indexes(connection, ('loans',))
+
+    if _table_exists(connection, 'borrow_record'):
+        with connection.cursor() as curs:
+            # A student's details came with every loan; where they differ, one of them is kept
+            curs.execute("""INSERT INTO students (stu_roll, stu_name, course, subject)
+                            SELECT stu_roll, COALESCE(MAX(stu_name), ''), MAX(course), MAX(subject) FROM borrow_record
+                            WHERE stu_roll NOT IN (SELECT stu_roll FROM students) GROUP BY stu_roll""")
+            curs.execute("""INSERT INTO loans (stu_roll, book_id, issue_date, return_date)
+                            SELECT b.stu_roll, b.book_id, b.issue_date, b.return_date FROM borrow_record b
+                            WHERE NOT EXISTS (SELECT 1 FROM loans l WHERE l.stu_roll = b.stu_roll AND l.book_id = b.book_id)""")
+        connection.commit()
+    with connection.cursor() as curs:
+        curs.execute("UPDATE students SET active_loans = (SELECT COUNT(*) FROM loans WHERE loans.stu_roll = students.stu_roll)")
+        for name, event, statement in ACTIVE_LOAN_TRIGGERS + LOAN_OVERDUE_TRIGGERS:
+            _create_trigger(connection, curs, name, event, 'loans', statement)
+        curs.execute("DROP TABLE IF EXISTS borrow_record") # Its triggers go with it
+
+
+def _migrate_loan_history(connection):
+    """
+    Adds loan_events, the daily rollup tables and the triggers filling both, then records
+    every current loan as an issue on its issue date (earlier history was never kept).
+    """
+    mysql = connection.dialect == "mysql"
+    with connection.cursor() as curs:
+        curs.execute(CREATE_LOAN_EVENTS + _table_options(connection) if mysql else SQLITE_CREATE_LOAN_EVENTS)
+        for table, (key, key_type, _) in LOAN_ROLLUPS.items():
+            counts = ", ".join(f"{column} INT NOT NULL DEFAULT 0" for column in ROLLUP_COUNTS)
+            curs.execute(f"CREATE TABLE IF NOT EXISTS {table} (day DATE NOT NULL, {key} {key_type} NOT NULL, {counts}, "
+                         f"PRIMARY KEY (day, {key})){_table_options(connection)}")
+    if not mysql:
+        _create_missing_indexes(connection, ('loan_events',))
+
+    # Each event adds 1 to its type's counter (comparisons are 0/1 in both dialects); the update
+    # repeats the increments rather than reading them back with VALUES()
+    increments = ("NEW.event_type = 'issue'", "NEW.event_type = 'return'", "NEW.event_type = 'reissue'",
+                  "COALESCE(NEW.stock_left = 0, 0)")
+    updates = ", ".join(f"{column} = {column} + ({increment})" for column, increment in zip(ROLLUP_COUNTS, increments))
+    with connection.cursor() as curs:
+        for table, (key, _, value) in LOAN_ROLLUPS.items():
+            _create_trigger(connection, curs, f"trg_events_{table}", 'INSERT', 'loan_events',
+                            f"INSERT INTO {table} (day, {key}, {', '.join(ROLLUP_COUNTS)}) "
+                            f"VALUES (NEW.event_date, {value}, {', '.join(increments)}) "
+                            f"ON DUPLICATE KEY UPDATE {updates}")
+        for name, event, event_type, row, condition in LOAN_EVENT_TRIGGERS:
+            stock_left = f"(SELECT qty FROM book_list WHERE book_id = {row}.book_id)" if event_type == 'issue' else "NULL"
+            _create_trigger(connection, curs, name, event, 'loans',
+                            f"INSERT INTO loan_events (event_date, event_type, book_id, stu_roll, course, subject, due_date, stock_left) "
+                            f"SELECT {TODAY[connection.dialect]}, '{event_type}', {row}.book_id, {row}.stu_roll, s.course, s.subject, "
+                            f"{row}.return_date, {stock_left} FROM students s WHERE s.stu_roll = {row}.stu_roll{condition}")
+        curs.execute("SELECT COUNT(*) FROM loan_events")
+        if not curs.fetchone()[0]:
+            curs.execute("""INSERT INTO loan_events (event_date, event_type, book_id, stu_roll, course, subject, due_date)
+                            SELECT l.issue_date, 'issue', l.book_id, l.stu_roll, s.course, s.subject, l.return_date
+                            FROM loans l JOIN students s ON s.stu_roll = l.stu_roll""")
+
+
+MIGRATIONS = [
+    (1, "book_list and borrow_record with indexes, DATE columns and qty CHECK", _migrate_base_tables),
+    (2, "library_meta catalog version, bumped by book_list triggers", _migrate_catalog_version),
+    (3, "return_date index and overdue_summary with its triggers", _migrate_overdue_summary),
+    (4, "students with active-loan counts and loans, replacing borrow_record", _migrate_students_and_loans),
+    (5, "loan_events history and daily rollups per book, course and subject", _migrate_loan_history),
+]
+
+
+# --- Internal Helpers ---
+def _table_options(connection):
+    return " ENGINE=InnoDB" if connection.dialect == "mysql" else ""
+
+
+def _create_trigger(connection, curs, name, event, table, statement):
+    """(Re)creates an AFTER trigger running one statement per changed row."""
+    if connection.dialect == "sqlite":
+        curs.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN {statement}; END")
+    else: # No IF NOT EXISTS before MySQL 8.0.29
+        curs.execute(f"DROP TRIGGER IF EXISTS {name}")
+        curs.execute(f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW {statement}")
+
+
+def _create_missing_indexes(connection, tables):
+    """Adds the REQUIRED_INDEXES of the given tables that are not there yet (no reordering of existing ones)."""
+    for table in tables:
+        if connection.dialect == "sqlite":
+            with connection.cursor() as curs:
+                for name, columns, unique in REQUIRED_INDEXES[table]:
+                    curs.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+                                 f"ON {table} ({', '.join(columns)})")
+            continue
+        existing = _existing_indexes(connection, table)
+        clauses = [f"ADD {'UNIQUE ' if unique else ''}INDEX {name} ({', '.join(columns)})"
+                   for name, columns, unique in REQUIRED_INDEXES[table]
+                   if not any(cols[:len(columns)] == columns and (is_unique or not unique)
+                              for cols, is_unique in existing.values())]
+        if clauses:
+            with connection.cursor() as curs:
+                curs.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+
+
+def _check_data(connection, borrow_books_only=False):
+    """
+    Raises SchemaError if existing rows would make the upgrade fail; runs before any DDL.
+    Args:
+        borrow_books_only (bool): Only check that every borrowed book is in book_list, which the
+            foreign key of loans needs (migration 4, on either backend).
+    """
+    problems = []
+    with connection.cursor() as curs:
+        curs.execute("""SELECT r.stu_roll, r.book_id FROM borrow_record r
+                        WHERE NOT EXISTS (SELECT 1 FROM book_list b WHERE b.book_id = r.book_id) LIMIT 5""")
+        orphans = curs.fetchall()
+        if orphans:
+            problems.append("borrow_record has loans of books missing from book_list (add the books or delete "
+                            "the loans), e.g. " + ", ".join(f"({roll}, {book_id})" for roll, book_id in orphans))
+    if borrow_books_only:
+        _raise_problems(problems)
+        return
+    with connection.cursor() as curs:
+        curs.execute("SELECT COUNT(*) FROM book_list WHERE qty < 0")
+        if curs.fetchone()[0]:
+            problems.append("book_list has rows with a negative qty")
+        curs.execute("SELECT stu_roll, book_id FROM borrow_record GROUP BY stu_roll, book_id HAVING COUNT(*) > 1 LIMIT 5")
+        duplicates = curs.fetchall()
+        if duplicates:
+            problems.append("borrow_record has duplicate (stu_roll, book_id) rows, e.g. " +
+                            ", ".join(f"({roll}, {book_id})" for roll, book_id in duplicates))
+        # No query parameters, so the driver leaves the % in the date format alone
+        curs.execute("SELECT COUNT(*) FROM borrow_record "
+                     "WHERE STR_TO_DATE(issue_date, '%Y-%m-%d') IS NULL OR STR_TO_DATE(return_date, '%Y-%m-%d') IS NULL")
+        if curs.fetchone()[0]:
+            problems.append("borrow_record has issue/return dates that are missing or not YYYY-MM-DD")
+    _raise_problems(problems)
+
+
+def _raise_problems(problems):
+    if problems:
+        raise SchemaError("Fix these rows before upgrading:\n- " + "\n- ".join(problems))
+
+
+def _table_exists(connection, table):
+    with connection.cursor() as curs:
+        if connection.dialect == "sqlite":
+            curs.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        else:
+            curs.execute("""SELECT COUNT(*) FROM information_schema.tables
+                            WHERE table_schema = DATABASE() AND table_name = %s""", (table,))
+        return curs.fetchone()[0] > 0
+
+
+def _existing_indexes(connection, table):
+    """Returns {index name: (column tuple, unique)} for a table in the current database."""
+    with connection.cursor() as curs:
+        curs.execute("""SELECT index_name, column_name, non_unique FROM information_schema.statistics
+                        WHERE table_schema = DATABASE() AND table_name = %s ORDER BY index_name, seq_in_index""",
+                     (table,))
+        indexes = {}
+        for name, column, non_unique in curs.fetchall():
+            columns, _ = indexes.get(name, ((), not non_unique))
+            indexes[name] = (columns + (column.lower(),), not non_unique)
+    return indexes
+
+
+def _column_type(connection, table, column):
+    with connection.cursor() as curs:
+        curs.execute("""SELECT data_type FROM information_schema.columns
+                        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s""", (table, column))
+        row = curs.fetchone()
+    return row[0].lower() if row else None
+
+
+def _supports_check_constraints(connection):
+    """CHECK is only enforced (and listed in information_schema) from MySQL 8.0.16 / MariaDB 10.2."""
+    with connection.cursor() as curs:
+        curs.execute("""SELECT COUNT(*) FROM information_schema.tables
+                        WHERE table_schema = 'information_schema' AND table_name = 'CHECK_CONSTRAINTS'""")
+        return curs.fetchone()[0] > 0
+
+
+def _check_constraints(connection, table):
+    with connection.cursor() as curs:
+        curs.execute("""SELECT constraint_name FROM information_schema.table_constraints
+                        WHERE table_schema = DATABASE() AND table_name = %s AND constraint_type = 'CHECK'""", (table,))
+        return {row[0] for row in curs.fetchall()}
+
+
+if __name__ == "__main__":
+    import credentials as cr
+    connection = storage.backend_from_settings(cr).connect()
+    try:
+        applied = upgrade(connection)
+        print("\n".join(applied) if applied else f"Schema is up to date (version {current_version(connection)}).")
+    except SchemaError as e:
+        print(e)
+    finally:
+        connection.close()
@@ -0,0 +1,265 @@
+# In-process full-text search over the catalog. An inverted index maps every word of
+# book_name, author and edition to the books containing it, so a search is a few dictionary
+# lookups instead of a LIKE '%term%' table scan. Results are ranked by relevance.
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+
+# Row layout shared with book_list / customs.columns
+BOOK_ID, BOOK_NAME, AUTHOR, EDITION, PRICE, QTY = range(6)
+
+# A word in the title counts more than one in the author, which counts more than the edition
+FIELD_WEIGHTS = ((BOOK_NAME, 3.0), (AUTHOR, 2.0), (EDITION, 1.0))
+PREFIX_MATCH_FACTOR = 0.6 # "pot" matching "potter" scores below an exact "potter"
+MIN_PREFIX_LEN = 2        # Shorter terms only match whole words (a 1-letter prefix matches half the catalog)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Splits text into lowercase word tokens."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _term_matches(term, word):
+    return word.startswith(term) if len(term) >= MIN_PREFIX_LEN else word == term
+
+
+def row_matches(row, query):
+    """True if row would be returned by SearchIndex.search(query) (same matching rules)."""
+    words = set()
+    for field, _ in FIELD_WEIGHTS:
+        words.update(tokenize(row[field]))
+    return all(any(_term_matches(term, word) for word in words) for term in tokenize(query))
+
+
+def narrows(broader, narrower):
+    """
+    True if every match of the query `narrower` is guaranteed to match `broader` too,
+    e.g. "harry p" narrows "har". Used to filter earlier results locally while the user types.
+    """
+    new_terms = tokenize(narrower)
+    return all(any(_term_matches(old, new) for new in new_terms) for old in tokenize(broader))
+
+
+class SearchIndex:
+    """
+    Thread-safe inverted index of book rows, keyed by book_id.
+    Every query term is matched as a word prefix ("har pot" finds "Harry Potter"), all terms
+    must match, and results are ordered by a field-weighted TF-IDF score.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}       # book_id -> row tuple
+        self._doc_terms = {}  # book_id -> {term: weight}, needed to unindex a row
+        self._postings = {}   # term -> {book_id: weight}
+        self._vocab = []      # Sorted list of all terms, for prefix lookups
+        self._build_lock = threading.Lock() # Serializes full builds (held while rows are loaded)
+        self._building = False
+        self._pending = []    # Updates that arrived while a rebuild was running
+        self.built_at = None  # time.monotonic() of the last full build
+        self.version = 0      # Bumped on every change, so callers can tell cached results are stale
+
+    @property
+    def ready(self):
+        return self.built_at is not None
+
+    @property
+    def building(self):
+        return self._building
+
+    def __len__(self):
+        return len(self._docs)
+
+    def age(self):
+        """Seconds since the last full build (infinite if never built)."""
+        return time.monotonic() - self.built_at if self.ready else math.inf
+
+    # --- Building ---
+    def begin_build(self):
+        """Marks the start of a full rebuild; updates made until finish_build() are replayed after it."""
+        with self._lock:
+            self._building = True
+            self._pending = []
+
+    def finish_build(self, rows):
+        """Replaces the index contents with rows, then reapplies updates that raced with the rebuild."""
+        docs, doc_terms, postings = {}, {}, {}
+        for row in rows:
+            terms = self._terms_of(row)
+            docs[row[BOOK_ID]] = tuple(row)
+            doc_terms[row[BOOK_ID]] = terms
+            for term, weight in terms.items():
+                postings.setdefault(term, {})[row[BOOK_ID]] = weight
+        with self._lock:
+            self._docs, self._doc_terms, self._postings = docs, doc_terms, postings
+            self._vocab = sorted(postings)
+            self._building = False
+            pending, self._pending = self._pending, []
+            for action, args in pending:
+                action(*args)
+            self.built_at = time.monotonic()
+            self.version += 1
+
+    def abort_build(self):
+        """Ends a rebuild that failed; the previous contents stay in place."""
+        with self._lock:
+            self._building = False
+            self._pending = []
+
+    def build(self, rows):
+        """Indexes rows from scratch."""
+        self.begin_build()
+        self.finish_build(rows)
+
+    def ensure_built(self, load_rows, max_age=None):
+        """
+        Builds the index from load_rows() unless it is already built (and younger than max_age).
+        Concurrent callers wait for the single build in progress instead of starting their own.
+        Returns:
+            bool: True if this call rebuilt the index.
+        """
+        with self._build_lock:
+            if self.ready and (max_age is None or self.age() <= max_age):
+                return False
+            self.begin_build()
+            try:
+                rows = load_rows()
+            except BaseException:
+                self.abort_build()
+                raise
+            self.finish_build(rows)
+            return True
+
+    # --- Incremental Updates ---
+    def add_or_update(self, row):
+        """Indexes a new or changed book row."""
+        row = (str(row[BOOK_ID]),) + tuple(row[1:])
+        with self._lock:
+            if self._building:
+                self._pending.append((self.add_or_update, (row,)))
+            self._remove_locked(row[BOOK_ID])
+            self.version += 1
+            terms = self._terms_of(row)
+            self._docs[row[BOOK_ID]] = tuple(row)
+            self._doc_terms[row[BOOK_ID]] = terms
+            for term, weight in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._vocab, term)
+                postings[row[BOOK_ID]] = weight
+
+    def remove(self, book_id):
+        """Drops a book from the index."""
+        book_id = str(book_id) # Treeview values may hand IDs back as ints
+        with self._lock:
+            if self._building:
+                self._pending.append((self.remove, (book_id,)))
+            self._remove_locked(book_id)
+            self.version += 1
+
+    def adjust_qty(self, book_id, delta):
+        """
+        Keeps the stored quantity in step with issues and returns (no re-indexing needed).
+        During a rebuild the resulting quantity is replayed rather than the delta, as the
+        rows being loaded may already include this write.
+        """
+        book_id = str(book_id)
+        with self._lock:
+            self._adjust_qty_locked(book_id, delta)
+            if self._building:
+                row = self._docs.get(book_id)
+                if row is not None and isinstance(row[QTY], int): # Unknown before the first build: the loaded rows are all there is
+                    self._pending.append((self._set_qty_locked, (book_id, row[QTY])))
+            self.version += 1
+
+    # --- Querying ---
+    def search(self, query, limit=None):
+        """
+        Returns the rows matching every term of query, best match first.
+        Args:
+            query (str): Free text; each word is matched as a prefix of indexed words.
+            limit (int): Maximum number of rows to return (None for all).
+        """
+        query_terms = list(dict.fromkeys(tokenize(query))) # Unique, in order
+        if not query_terms:
+            return []
+        with self._lock:
+            num_docs = len(self._docs) or 1
+            scores = None
+            # Rarest term first so the candidate set shrinks as fast as possible
+            per_term = sorted((self._match_term(term) for term in query_terms), key=len)
+            for matches in per_term:
+                if not matches:
+                    return []
+                idf = math.log(1 + num_docs / len(matches))
+                if scores is None:
+                    scores = {book_id: weight * idf for book_id, weight in matches.items()}
+                else:
+                    scores = {book_id: score + matches[book_id] * idf
+                              for book_id, score in scores.items() if book_id in matches}
+                if not scores:
+                    return []
+            rank_key = lambda item: (-item[1], self._docs[item[0]][BOOK_NAME] or "", item[0])
+            if limit is not None and limit < len(scores):
+                ranked = heapq.nsmallest(limit, scores.items(), key=rank_key)
+            else:
+                ranked = sorted(scores.items(), key=rank_key)
+            return [self._docs[book_id] for book_id, _ in ranked]
+
+    # --- Internal Helpers ---
+    def _terms_of(self, row):
+        """Returns {term: weight} for a row, summing field weights for repeated words."""
+        terms = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(row[field]):
+                terms[term] = terms.get(term, 0.0) + weight
+        return terms
+
+    def _match_term(self, prefix):
+        """Returns {book_id: best weight} for every indexed word starting with prefix."""
+        if len(prefix) < MIN_PREFIX_LEN:
+            return dict(self._postings.get(prefix, {}))
+        matches = {}
+        vocab = self._vocab
+        for index in range(bisect.bisect_left(vocab, prefix), len(vocab)):
+            term = vocab[index]
+            if not term.startswith(prefix):
+                break
+            factor = 1.0 if term == prefix else PREFIX_MATCH_FACTOR
+            for book_id, weight in self._postings[term].items():
+                weight *= factor
+                if weight > matches.get(book_id, 0.0):
+                    matches[book_id] = weight
+        return matches
+
+    def _remove_locked(self, book_id):
+        terms = self._doc_terms.pop(book_id, None)
+        self._docs.pop(book_id, None)
+        if not terms:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                index = bisect.bisect_left(self._vocab, term)
+                if index < len(self._vocab) and self._vocab[index] == term:
+                    del self._vocab[index]
+
+    def _adjust_qty_locked(self, book_id, delta):
+        row = self._docs.get(book_id)
+        if row is not None and isinstance(row[QTY], int):
+            self._docs[book_id] = row[:QTY] + (row[QTY] + delta,) + row[QTY + 1:]
+
+    def _set_qty_locked(self, book_id, qty):
+        row = self._docs.get(book_id)
+        if row is not None:
+            self._docs[book_id] = row[:QTY] + (qty,) + row[QTY + 1:]
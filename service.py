@@ -0,0 +1,323 @@
+# Library operations without any GUI: catalog reads and writes, search and circulation, with
+# the input checks the desk forms used to do themselves. One LibraryService owns the
+# connection pool, the catalog cache and the search index, and every client shares them:
+# the CTk desk app calls it in-process, api_server.py serves it over HTTP/JSON to other
+# desks, kiosks and the web catalog.
+#
+# Methods block (they run SQL), so callers run them off their UI/event-loop thread: the
+# desk app on its BackgroundWorker, the server on its executor. They are thread-safe.
+
+import datetime
+import math
+import threading
+import time
+from functools import partial
+
+import library_db as ldb
+from catalog_cache import CatalogCache
+from search_index import SearchIndex
+from overdue import check_loan_dates, check_new_return_date
+
+CATALOG_CHECK_INTERVAL = 5  # Seconds between checks of the catalog version for other desks' changes
+CATALOG_MAX_AGE = 600       # Seconds the catalog cache is trusted on a database without a catalog version
+SEARCH_LIMIT = 500          # Default number of search results
+PAGE_LIMIT = 150            # Default catalog page size
+MAX_PAGE_LIMIT = 1000       # Largest page/result count a client may ask for
+DASHBOARD_DAYS = 30         # Default period of the circulation dashboard
+MAX_DASHBOARD_DAYS = 3660   # Longest period a client may ask for (ten years)
+
+
+class ValidationError(ValueError):
+    """Bad input from a client. The message can be shown to the user as is."""
+
+
+# --- Input Checks (shared by the desk forms and the HTTP API) ---
+def check_book_fields(book_id, book_name, price, qty):
+    """
+    Validates the Add/Update Book fields.
+    Args:
+        price, qty: As typed (str) or already numeric; an empty price means 0.
+    Returns:
+        tuple: (price as float, qty as int).
+    Raises:
+        ValidationError: With the message the forms show.
+    """
+    if not book_id or not book_name: # Require at least Book ID and Name
+        raise ValidationError("Book ID and Book Name are required.")
+    price_text = str(price).strip() if price is not None else ""
+    qty_text = str(qty).strip() if qty is not None else ""
+    try:
+        price = float(price_text) if price_text else 0.0
+        if not math.isfinite(price): raise ValueError("Price must be a finite number.")
+        if price < 0: raise ValueError("Price cannot be negative.")
+    except ValueError as e:
+        raise ValidationError(f"Invalid input for Price: {e}") from None
+    try:
+        if not qty_text or int(qty_text) < 0:
+            raise ValueError("Quantity must be a whole number (0 or greater).")
+        qty = int(qty_text)
+    except ValueError as e:
+        raise ValidationError(f"Invalid input for Quantity: {e}") from None
+    return price, qty
+
+
+def check_loan_fields(stu_roll, stu_name, issue_date, return_date):
+    """
+    Validates the student and dates of a new loan.
+    Returns:
+        tuple: (issue date, return date) as ISO strings.
+    Raises:
+        ValidationError: If a field is missing or the dates are wrong.
+    """
+    if not all([stu_roll, stu_name, issue_date, return_date]):
+        raise ValidationError("Student roll, name and both dates are required to issue a book.")
+    try:
+        return tuple(date.isoformat() for date in check_loan_dates(str(issue_date), str(return_date)))
+    except ValueError as e:
+        raise ValidationError(str(e)) from None
+
+
+def _limit(value, default):
+    try:
+        value = int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        raise ValidationError("limit must be a whole number.") from None
+    return max(1, min(value, MAX_PAGE_LIMIT))
+
+
+class LibraryService:
+    """
+    The library's operations for any number of concurrent clients.
+    Writes are applied to the shared catalog cache and search index once committed, so all
+    clients see them at once; changes made by other processes are picked up through the
+    catalog version (see catalog_cache.py).
+    """
+    def __init__(self, pool, check_interval=CATALOG_CHECK_INTERVAL, max_age=CATALOG_MAX_AGE):
+        """
+        Args:
+            pool (ConnectionPool): Connections for every operation.
+            check_interval (float): Minimum seconds between catalog version checks.
+            max_age (float): Seconds the cache is trusted without a catalog version (older schema).
+        """
+        self.pool = pool
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.catalog = CatalogCache()
+        self.search_index = SearchIndex()
+        self._refresh_lock = threading.Lock() # One version check/reload at a time; others keep serving the cache
+        self.started = time.monotonic()
+
+    # --- Catalog Cache ---
+    def load_catalog(self, connection, reload=False):
+        """
+        Loads the catalog cache from book_list (unless already loaded, or reload=True) and
+        rebuilds the search index from the loaded rows.
+        Returns:
+            bool: True if this call loaded it.
+        """
+        load = partial(ldb.fetch_catalog_snapshot, connection)
+        if reload:
+            self.catalog.reload(load)
+        elif not self.catalog.ensure_loaded(load):
+            return False
+        self.search_index.build(self.catalog.rows())
+        return True
+
+    def warm_catalog(self):
+        """Loads the catalog cache if it is not loaded yet. Returns True if this call loaded it."""
+        if self.catalog.ready:
+            return False
+        with self.pool.connection() as connection:
+            return self.load_catalog(connection)
+
+    def revalidate_catalog(self, force=False):
+        """
+        Reloads the cache if another process changed book_list, checking the catalog version
+        at most every check_interval seconds (unless force). If a check is already running on
+        another thread, returns at once instead of waiting for it.
+        Returns:
+            bool: True if the cache was reloaded.
+        """
+        if not self.catalog.ready:
+            return self.warm_catalog()
+        if not force and self.catalog.checked_within(self.check_interval):
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            with self.pool.connection() as connection:
+                if self.catalog.is_current(ldb.fetch_catalog_version(connection), max_age=self.max_age):
+                    return False
+                self.load_catalog(connection, reload=True)
+                return True
+        finally:
+            self._refresh_lock.release()
+
+    def catalog_changed(self, action, *args):
+        """Applies a committed write (add_or_update, remove or adjust_qty) to the catalog cache and search index."""
+        getattr(self.catalog, action)(*args)
+        getattr(self.search_index, action)(*args)
+
+    # --- Books ---
+    def list_books(self, after=None, before=None, limit=PAGE_LIMIT):
+        """Catalog page in title order; same contract as library_db.fetch_books_page, served from the cache."""
+        self.revalidate_catalog()
+        return self.catalog.page(after, before, _limit(limit, PAGE_LIMIT))
+
+    def get_book(self, book_id):
+        """Returns a book's row, or None. A miss checks the catalog version first, as the book may be new."""
+        self.revalidate_catalog()
+        row = self.catalog.get(book_id)
+        if row is None and self.revalidate_catalog(force=True):
+            row = self.catalog.get(book_id)
+        return row
+
+    def search_books(self, query, limit=SEARCH_LIMIT):
+        """Ranked search over the catalog (see search_index.py)."""
+        self.revalidate_catalog()
+        self.search_index.ensure_built(self.catalog.rows)
+        return self.search_index.search(query, limit=_limit(limit, SEARCH_LIMIT))
+
+    def add_book(self, book_id, book_name, author="", edition="", price="", qty=""):
+        """
+        Adds a book. Returns False if the ID is already taken.
+        Raises:
+            ValidationError: If a field is invalid.
+        """
+        book_id, book_name = str(book_id or "").strip(), str(book_name or "").strip()
+        price, qty = check_book_fields(book_id, book_name, price, qty)
+        author, edition = (author or "").strip(), (edition or "").strip()
+        with self.pool.connection() as connection:
+            added = ldb.add_book(connection, book_id, book_name, author, edition, price, qty)
+        if added:
+            self.catalog_changed('add_or_update', (book_id, book_name, author or None, edition or None, price, qty))
+        return added
+
+    def update_book(self, book_id, book_name, author="", edition="", price="", qty=""):
+        """
+        Updates a book's details. Returns 1, or 0 if the ID is unknown.
+        Raises:
+            ValidationError: If a field is invalid.
+        """
+        book_id, book_name = str(book_id or "").strip(), str(book_name or "").strip()
+        price, qty = check_book_fields(book_id, book_name, price, qty)
+        author, edition = (author or "").strip(), (edition or "").strip()
+        with self.pool.connection() as connection:
+            updated = ldb.update_book(connection, book_id, book_name, author, edition, price, qty)
+        if updated > 0:
+            self.catalog_changed('add_or_update', (book_id, book_name, author or None, edition or None, price, qty))
+        return updated
+
+    def delete_book(self, book_id):
+        """Deletes a book unless it is borrowed. Returns the number of blocking borrows (0 = deleted)."""
+        with self.pool.connection() as connection:
+            borrow_count = ldb.delete_book(connection, book_id)
+        if borrow_count == 0:
+            self.catalog_changed('remove', book_id)
+        return borrow_count
+
+    # --- Circulation ---
+    def issue_book(self, book_id, book_name, stu_roll, stu_name, course, subject, issue_date, return_date):
+        """
+        Issues one book. Returns an outcome constant of library_db (ISSUED, OUT_OF_STOCK, ...).
+        book_name is the name the desk showed; loans store only the ID and read the name from book_list.
+        Raises:
+            ValidationError: If a field is missing or the dates are wrong.
+        """
+        if not all([book_id, book_name, stu_roll, stu_name, issue_date, return_date]):
+            raise ValidationError("All fields are required to issue a book.")
+        issue_date, return_date = check_loan_fields(stu_roll, stu_name, issue_date, return_date)
+        with self.pool.connection() as connection:
+            outcome = ldb.issue_book(connection, book_id, stu_roll, stu_name, course, subject, issue_date, return_date)
+        if outcome == ldb.ISSUED:
+            self.catalog_changed('adjust_qty', book_id, -1)
+        return outcome
+
+    def issue_books(self, book_ids, stu_roll, stu_name, course, subject, issue_date, return_date):
+        """
+        Issues several books to one student in one transaction.
+        Returns:
+            list: (book_id, outcome) for every requested book.
+        Raises:
+            ValidationError: If no book is given, a field is missing or the dates are wrong.
+        """
+        book_ids = [str(book_id).strip() for book_id in book_ids or () if str(book_id).strip()]
+        if not book_ids:
+            raise ValidationError("No Book IDs to issue.")
+        issue_date, return_date = check_loan_fields(stu_roll, stu_name, issue_date, return_date)
+        with self.pool.connection() as connection:
+            outcomes = ldb.issue_books(connection, book_ids, stu_roll, stu_name, course, subject,
+                                       issue_date, return_date)
+        for book_id, outcome in outcomes:
+            if outcome == ldb.ISSUED:
+                self.catalog_changed('adjust_qty', book_id, -1)
+        return outcomes
+
+    def return_books(self, loans):
+        """
+        Returns several books in one transaction.
+        Args:
+            loans (list): (stu_roll, book_id) pairs.
+        Returns:
+            list: The pairs that were returned.
+        """
+        loans = [(str(stu_roll), str(book_id)) for stu_roll, book_id in loans or ()]
+        if not loans:
+            raise ValidationError("No loans to return.")
+        with self.pool.connection() as connection:
+            returned = ldb.return_books(connection, loans)
+        returned_ids = {}
+        for _, book_id in returned:
+            returned_ids[book_id] = returned_ids.get(book_id, 0) + 1
+        for book_id, count in returned_ids.items():
+            self.catalog_changed('adjust_qty', book_id, count)
+        return returned
+
+    def reissue_book(self, book_id, stu_roll, new_return_date, issue_date=None):
+        """
+        Moves a loan's return date. Returns the number of loans changed (0 if it was returned already).
+        Raises:
+            ValidationError: If the new date is malformed, in the past or too far out.
+        """
+        try:
+            new_return_date = check_new_return_date(str(new_return_date or ""), issue_date).isoformat()
+        except ValueError as e:
+            raise ValidationError(str(e)) from None
+        with self.pool.connection() as connection:
+            return ldb.reissue_book(connection, book_id, stu_roll, new_return_date)
+
+    def borrow_records(self, stu_roll=None):
+        """All active loans, or those of one student."""
+        with self.pool.connection() as connection:
+            if stu_roll:
+                return ldb.fetch_borrow_records_for_student(connection, stu_roll)
+            return ldb.fetch_all_borrow_records(connection)
+
+    def overdue(self, limit=500):
+        """The overdue summary built by the last scan (see library_db.fetch_overdue_summary)."""
+        with self.pool.connection() as connection:
+            return ldb.fetch_overdue_summary(connection, limit=_limit(limit, 500))
+
+    def dashboard(self, days=DASHBOARD_DAYS, limit=10):
+        """
+        Circulation of the last `days` days, today included (see library_db.fetch_circulation_dashboard),
+        with the period as since (first day) and days.
+        Raises:
+            ValidationError: If days is not a whole number.
+        """
+        try:
+            days = int(days) if days not in (None, "") else DASHBOARD_DAYS
+        except (TypeError, ValueError):
+            raise ValidationError("days must be a whole number.") from None
+        days = max(1, min(days, MAX_DASHBOARD_DAYS))
+        since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        with self.pool.connection() as connection:
+            dashboard = ldb.fetch_circulation_dashboard(connection, since, limit=_limit(limit, 10))
+        dashboard.update(since=since, days=days)
+        return dashboard
+
+    def stats(self):
+        """Pool and cache counters, for monitoring."""
+        return {'uptime_s': round(time.monotonic() - self.started, 1), 'pool': self.pool.stats(),
+                'catalog': {'books': len(self.catalog), 'version': self.catalog.version,
+                            'age_s': round(self.catalog.age(), 1) if self.catalog.ready else None}}
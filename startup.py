@@ -0,0 +1,82 @@
+# Cold-start timing for main.py. The start-up path is split into sequential phases (imports,
+# window, layout, first frame) and background milestones (schema check, pool and cache
+# warm-up), so a regression can be pinned on the step that caused it.
+#
+#     python main.py --startup-report                 (prints the breakdown)
+#     python main.py --startup-report=startup.jsonl   (also appends it as one JSON line)
+#
+# BOOKNEST_STARTUP_REPORT=<file> does the same as the second form. For a per-module import
+# breakdown, run `python -X importtime main.py`.
+
+import json
+import os
+import sys
+import time
+
+REPORT_FLAG = "--startup-report"
+REPORT_ENV = "BOOKNEST_STARTUP_REPORT"
+
+
+def requested_report():
+    """
+    Returns where the start-up report should go: None (not requested), "" (print only)
+    or the path of a JSON-lines file to append to.
+    """
+    for arg in sys.argv[1:]:
+        if arg == REPORT_FLAG:
+            return ""
+        if arg.startswith(REPORT_FLAG + "="):
+            return arg.split("=", 1)[1]
+    return os.environ.get(REPORT_ENV) or None
+
+
+class StartupTimer:
+    """Collects phase durations and milestone offsets, measured from construction."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []      # (name, seconds) of sequential phases, in order
+        self.milestones = []  # (name, seconds since start) of background steps
+        self.reported = False
+
+    def mark(self, name):
+        """Ends the current sequential phase (it started where the previous one ended)."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def milestone(self, name):
+        """Records when a background step finished, relative to the start."""
+        self.milestones.append((name, time.perf_counter() - self.started))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def format(self):
+        """Human-readable breakdown."""
+        total = sum(seconds for _, seconds in self.phases) or 1e-9
+        lines = ["Start-up phases:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<28} {seconds * 1000:8.1f} ms  {seconds / total:6.1%}")
+        lines.append(f"  {'= first frame':<28} {total * 1000:8.1f} ms")
+        if self.milestones:
+            lines.append("Background warm-up (since start):")
+            for name, offset in self.milestones:
+                lines.append(f"  {name:<28} {offset * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in self.phases},
+                'first_frame_ms': round(sum(seconds for _, seconds in self.phases) * 1000, 2),
+                'milestones_ms': {name: round(offset * 1000, 2) for name, offset in self.milestones}}
+
+    def report(self, path=""):
+        """Prints the breakdown and, if path is given, appends it to that JSON-lines file (once)."""
+        if self.reported:
+            return
+        self.reported = True
+        print(self.format())
+        if path:
+            with open(path, "a", encoding="utf-8") as report_file:
+                report_file.write(json.dumps(self.to_dict()) + "\n")
@@ -0,0 +1,345 @@
+# Storage backends. Everything that talks to the database (library_db, schema, the pool)
+# goes through a StorageConnection, so the same code runs on a MySQL server or on an
+# embedded SQLite file - no server needed for a single-desk branch library, and an
+# in-memory database for benchmarks. SQL is written once in MySQL style (%s placeholders)
+# and translated for SQLite.
+#
+# Driver errors are re-raised as the DatabaseError hierarchy below, so callers never need
+# to import pymysql or sqlite3 themselves.
+
+import os
+import re
+import sqlite3
+import time
+from functools import lru_cache
+
+import instrumentation
+
+# MySQL error codes
+ER_DUP_ENTRY = 1062
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+
+
+class DatabaseError(Exception):
+    """Base class of every storage error."""
+
+
+class InterfaceError(DatabaseError):
+    """The connection (or pool) cannot be used any more."""
+
+
+class OperationalError(DatabaseError):
+    """The server or file failed the request (connection lost, disk full, ...)."""
+
+
+class LockConflict(OperationalError):
+    """Deadlock, lock wait timeout or a busy SQLite file; the transaction was rolled back and can be retried."""
+
+
+class IntegrityError(DatabaseError):
+    """A constraint rejected the change."""
+
+
+class DuplicateKeyError(IntegrityError):
+    """A primary or unique key already has this value."""
+
+
+class StorageCursor:
+    """DB-API cursor wrapper: translates SQL for the backend and maps driver errors."""
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, args=None):
+        """Runs one statement. Returns the number of affected rows (like pymysql)."""
+        backend = self._connection.backend
+        started = time.perf_counter() if instrumentation.enabled else None
+        with backend.translate_errors():
+            if args is None:
+                self._cursor.execute(backend.translate(sql))
+            else:
+                self._cursor.execute(backend.translate(sql), args)
+        if started is not None:
+            self._sql = sql # For the slow-query log of the fetch that follows
+            instrumentation.record_query("execute", sql, time.perf_counter() - started)
+        return self._cursor.rowcount
+
+    def executemany(self, sql, seq_of_args):
+        backend = self._connection.backend
+        started = time.perf_counter() if instrumentation.enabled else None
+        with backend.translate_errors():
+            self._cursor.executemany(backend.translate(sql), seq_of_args)
+        if started is not None:
+            instrumentation.record_query("executemany", sql, time.perf_counter() - started)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        with self._connection.backend.translate_errors():
+            return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        if instrumentation.enabled:
+            return self._timed_fetch(self._cursor.fetchmany, size)
+        with self._connection.backend.translate_errors():
+            return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        if instrumentation.enabled:
+            return self._timed_fetch(self._cursor.fetchall)
+        with self._connection.backend.translate_errors():
+            return self._cursor.fetchall()
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        with self._connection.backend.translate_errors():
+            rows = fetch(*args)
+        instrumentation.record_query("fetch", getattr(self, '_sql', ""), time.perf_counter() - started)
+        return rows
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+
+
+class StorageConnection:
+    """Wraps a driver connection; this is the `connection` every library_db function receives."""
+    def __init__(self, backend, raw):
+        self.backend = backend
+        self.raw = raw
+
+    @property
+    def dialect(self):
+        """"mysql" or "sqlite", for the few places that need backend-specific SQL (schema)."""
+        return self.backend.dialect
+
+    @property
+    def open(self):
+        return self.backend.is_open(self.raw)
+
+    def cursor(self, *args):
+        with self.backend.translate_errors():
+            return StorageCursor(self, self.raw.cursor(*args))
+
+    def streaming_cursor(self):
+        """
+        Cursor that hands rows over as they arrive instead of buffering the whole result
+        (pymysql's SSCursor), for reading tables of any size with fetchmany(). Until all rows
+        are read or the cursor is closed, the connection cannot run other statements.
+        """
+        with self.backend.translate_errors():
+            return StorageCursor(self, self.backend.streaming_cursor(self.raw))
+
+    def begin_write(self):
+        """
+        Starts a transaction that is going to write. SQLite has no row locks (FOR UPDATE is
+        dropped), so there this takes the database write lock up front, and what the transaction
+        reads cannot change before it writes. On MySQL the FOR UPDATE reads do that job.
+        """
+        with self.backend.translate_errors():
+            self.backend.begin_write(self.raw)
+
+    def commit(self):
+        with self.backend.translate_errors():
+            self.raw.commit()
+
+    def rollback(self):
+        with self.backend.translate_errors():
+            self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        with self.backend.translate_errors():
+            self.backend.ping(self.raw)
+
+    def close(self):
+        with self.backend.translate_errors():
+            self.backend.close(self.raw)
+
+
+class MySQLBackend:
+    """MySQL/MariaDB through pymysql (imported on first connect)."""
+    dialect = "mysql"
+
+    def __init__(self, host, user, password, database, connect_timeout=5):
+        self.settings = {'host': host, 'user': user, 'password': password,
+                         'database': database, 'connect_timeout': connect_timeout}
+        self._pymysql = None
+
+    def connect(self):
+        """Opens a new connection (used as the ConnectionPool factory)."""
+        if self._pymysql is None:
+            import pymysql # Deferred so SQLite-only installs do not need the driver
+            self._pymysql = pymysql
+        with self.translate_errors():
+            return StorageConnection(self, self._pymysql.connect(**self.settings))
+
+    def translate(self, sql):
+        return sql
+
+    def streaming_cursor(self, raw):
+        return raw.cursor(self._pymysql.cursors.SSCursor)
+
+    def begin_write(self, raw):
+        pass # Transactions start implicitly; locking reads use FOR UPDATE
+
+    def is_open(self, raw):
+        return raw.open
+
+    def ping(self, raw):
+        raw.ping(reconnect=False)
+
+    def close(self, raw):
+        raw.close()
+
+    def translate_errors(self):
+        return _ErrorTranslator(self._map_error)
+
+    def _map_error(self, error):
+        pymysql = self._pymysql
+        if pymysql is None or not isinstance(error, pymysql.Error):
+            return None
+        code = error.args[0] if error.args else None
+        if isinstance(error, pymysql.err.IntegrityError):
+            return (DuplicateKeyError if code == ER_DUP_ENTRY else IntegrityError)(*error.args)
+        if isinstance(error, pymysql.err.OperationalError):
+            return (LockConflict if code in (ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT) else OperationalError)(*error.args)
+        if isinstance(error, pymysql.err.InterfaceError):
+            return InterfaceError(*error.args)
+        return DatabaseError(*error.args)
+
+
+class SQLiteBackend:
+    """
+    Embedded SQLite database file in WAL mode (readers never block the writer).
+    path=":memory:" gives a private in-memory database shared by all pooled connections.
+    """
+    dialect = "sqlite"
+    _memory_ids = iter(range(1, 1 << 30))
+
+    def __init__(self, path, busy_timeout=10, cached_statements=256):
+        """
+        Args:
+            path (str): Database file, or ":memory:".
+            busy_timeout (float): Seconds a writer waits for another writer before LockConflict.
+            cached_statements (int): Prepared statements kept per connection.
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._keeper = None
+        if path == ":memory:":
+            # Named shared-cache database; it lives as long as one connection to it is open
+            self._uri = f"file:booknest_mem_{next(self._memory_ids)}?mode=memory&cache=shared"
+            self._keeper = self._open()
+        else:
+            self._uri = None
+
+    def connect(self):
+        with self.translate_errors():
+            return StorageConnection(self, self._open())
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def translate(sql):
+        """Rewrites the MySQL-isms library_db uses into SQLite syntax (cached per statement)."""
+        sql = sql.replace("%s", "?")
+        # SQLite serializes writers on the whole file, so row locks are not needed (or supported)
+        sql = sql.replace(" FOR UPDATE", "")
+        if "ON DUPLICATE KEY UPDATE" in sql:
+            head, update = sql.split("ON DUPLICATE KEY UPDATE", 1)
+            update = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", update)
+            sql = head + "ON CONFLICT DO UPDATE SET" + update
+        return sql
+
+    def streaming_cursor(self, raw):
+        return raw.cursor() # sqlite3 steps through the result as rows are fetched
+
+    def begin_write(self, raw):
+        if not raw.in_transaction:
+            raw.execute("BEGIN IMMEDIATE") # Waits up to busy_timeout for other writers, then LockConflict
+
+    def is_open(self, raw):
+        try:
+            raw.total_changes # Raises ProgrammingError once closed
+            return True
+        except sqlite3.ProgrammingError:
+            return False
+
+    def ping(self, raw):
+        raw.execute("SELECT 1").fetchone()
+
+    def close(self, raw):
+        raw.close()
+
+    def translate_errors(self):
+        return _ErrorTranslator(self._map_error)
+
+    def _open(self):
+        if self._uri is not None:
+            raw = sqlite3.connect(self._uri, uri=True, timeout=self.busy_timeout,
+                                  check_same_thread=False, cached_statements=self.cached_statements)
+        else:
+            raw = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                  check_same_thread=False, cached_statements=self.cached_statements)
+            raw.execute("PRAGMA journal_mode=WAL")
+            raw.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; commits skip an fsync
+        raw.execute("PRAGMA foreign_keys=ON")
+        return raw
+
+    def _map_error(self, error):
+        if not isinstance(error, sqlite3.Error):
+            return None
+        message = str(error)
+        if isinstance(error, sqlite3.IntegrityError):
+            return (DuplicateKeyError if "UNIQUE" in message or "PRIMARY KEY" in message else IntegrityError)(message)
+        if isinstance(error, sqlite3.OperationalError):
+            return (LockConflict if "locked" in message or "busy" in message else OperationalError)(message)
+        if isinstance(error, sqlite3.ProgrammingError):
+            return InterfaceError(message)
+        return DatabaseError(message)
+
+
+class _ErrorTranslator:
+    """Context manager re-raising driver errors as storage errors (original kept as __cause__)."""
+    def __init__(self, map_error):
+        self._map_error = map_error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None or isinstance(exc, DatabaseError):
+            return False
+        mapped = self._map_error(exc)
+        if mapped is None:
+            return False
+        raise mapped from exc
+
+
+def backend_from_settings(settings):
+    """
+    Builds the backend selected in credentials.py.
+    Args:
+        settings: Module (or object) with `backend` ("mysql" or "sqlite") and the matching options.
+    """
+    name = settings.backend
+    if name == "sqlite":
+        path = settings.sqlite_path
+        if path != ":memory:": # Relative paths are next to the application, not the working directory
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        return SQLiteBackend(path)
+    if name == "mysql":
+        return MySQLBackend(settings.host, settings.user, settings.password, settings.database)
+    raise ValueError(f"Unknown storage backend '{name}' (expected 'mysql' or 'sqlite').")
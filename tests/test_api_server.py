@@ -0,0 +1,113 @@
+# ApiServer routing and status codes, through ApiClient and raw HTTP, on an SQLite file.
+#
+#     python -m pytest tests/test_api_server.py
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+import api_server
+import library_db as ldb
+import schema
+import storage
+from api_server import ApiClient, ApiServer
+from db_pool import ConnectionPool
+from service import LibraryService, ValidationError
+
+ISSUE_DATE, RETURN_DATE = "2026-01-05", "2026-01-19"
+
+
+class ApiServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        backend = storage.SQLiteBackend(os.path.join(cls.directory.name, "library.sqlite3"))
+        cls.pool = ConnectionPool(backend.connect, size=2)
+        with cls.pool.connection() as connection:
+            schema.upgrade(connection)
+            ldb.add_book(connection, "B1", "Harry Potter", "Rowling", "", 10.0, 2)
+        cls.loop = asyncio.new_event_loop()
+        server = ApiServer(LibraryService(cls.pool), workers=2)
+        cls.listener = cls.loop.run_until_complete(asyncio.start_server(server.handle_connection, "127.0.0.1", 0))
+        cls.port = cls.listener.sockets[0].getsockname()[1]
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.listener.close()
+        cls.loop.run_until_complete(cls.listener.wait_closed())
+        cls.loop.close()
+        cls.pool.close_all()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.client = ApiClient(f"http://127.0.0.1:{self.port}")
+
+    def request(self, method, path, body=None):
+        """Returns (status, payload) of one request on a fresh connection."""
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        try:
+            connection.request(method, path, body=body)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def send_raw(self, data):
+        """Sends raw bytes and returns the status code of the answer."""
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(data)
+            return int(sock.makefile('rb').readline().split()[1])
+
+    def test_issue_and_duplicate(self):
+        self.assertEqual(self.client.issue_book("B1", "Harry Potter", "R1", "Ann", "BSc", "Physics",
+                                                ISSUE_DATE, RETURN_DATE), ldb.ISSUED)
+        self.assertEqual(self.client.issue_book("B1", "Harry Potter", "R1", "Ann", "BSc", "Physics",
+                                                ISSUE_DATE, RETURN_DATE), ldb.ALREADY_BORROWED)
+        self.assertEqual(self.client.get_book("B1")[5], 1)
+        self.assertEqual(self.client.return_books([("R1", "B1")]), [("R1", "B1")])
+
+    def test_book_ids_must_be_a_list(self):
+        status, payload = self.request('POST', '/loans', json.dumps({'book_ids': "B1", 'stu_roll': "R2"}))
+        self.assertEqual(status, 400)
+        self.assertIn("book_ids", payload['error'])
+        with self.assertRaises(ValidationError):
+            self.client.add_book("B2", "Bad Price", price="NaN", qty=1)
+
+    def test_unknown_book_and_resource(self):
+        self.assertIsNone(self.client.get_book("NOPE"))
+        self.assertEqual(self.request('GET', '/books/NOPE')[0], 404)
+        self.assertEqual(self.request('GET', '/nowhere')[0], 404)
+        self.assertEqual(self.client.update_book("NOPE", "Title", qty=1), 0)
+
+    def test_unsupported_method(self):
+        status, payload = self.request('DELETE', '/search')
+        self.assertEqual(status, 405)
+        self.assertIn("DELETE", payload['error'])
+
+    def test_malformed_requests(self):
+        self.assertEqual(self.send_raw(b"GARBAGE\r\n\r\n"), 400)
+        self.assertEqual(self.request('POST', '/books', b"{not json")[0], 400)
+        self.assertEqual(self.request('POST', '/books', b"[1, 2]")[0], 400)
+        self.assertEqual(self.send_raw(b"GET /books HTTP/1.1\r\nContent-Length: x\r\n\r\n"), 400)
+
+    def test_oversized_request_line_and_header(self):
+        self.assertEqual(self.send_raw(b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n"), 414)
+        self.assertEqual(self.send_raw(b"GET /books HTTP/1.1\r\nX-Big: " + b"a" * 70000 + b"\r\n\r\n"), 431)
+        self.assertEqual(self.request('GET', '/books')[0], 200) # The server keeps serving
+
+    def test_body_too_large(self):
+        self.assertEqual(self.send_raw(b"POST /books HTTP/1.1\r\nContent-Length: %d\r\n\r\n"
+                                       % (api_server.MAX_BODY + 1)), 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+# Book field validation shared by the forms, the API and the catalog import.
+#
+#     python -m pytest tests/test_book_fields.py
+
+import unittest
+
+import bulk_import
+from service import ValidationError, check_book_fields
+
+
+class CheckBookFieldsTest(unittest.TestCase):
+    def test_price_and_qty_are_converted(self):
+        self.assertEqual(check_book_fields("B1", "Book", " 12.5 ", "3"), (12.5, 3))
+        self.assertEqual(check_book_fields("B1", "Book", "", "0"), (0.0, 0))
+
+    def test_non_finite_prices_are_rejected(self):
+        for price in ("nan", "NaN", "inf", "-inf", "Infinity", float("nan"), float("inf")):
+            with self.subTest(price=price), self.assertRaises(ValidationError) as raised:
+                check_book_fields("B1", "Book", price, "1")
+            self.assertIn("finite", str(raised.exception))
+
+    def test_catalog_rows_with_a_nan_price_are_rejected(self):
+        positions = list(range(len(bulk_import.CATALOG_COLUMNS)))
+        with self.assertRaises(ValidationError):
+            bulk_import._catalog_row(["B1", "Book", "", "", "nan", "1"], positions)
+        self.assertEqual(bulk_import._catalog_row(["B1", "Book", "", "", "9.99", "1"], positions),
+                         ("B1", "Book", "", "", 9.99, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# Many desks issuing at once must never oversell a book or break the borrow limit. Each
+# thread has its own connection to one SQLite file (as desks have their own to the server).
+#
+#     python -m pytest tests/test_issue_concurrency.py
+
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import library_db as ldb
+import schema
+import storage
+
+THREADS = 40
+ISSUE_DATE, RETURN_DATE = "2026-01-05", "2026-01-19"
+
+
+class IssueConcurrencyTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = storage.SQLiteBackend(os.path.join(directory.name, "library.sqlite3"), busy_timeout=30)
+        self.connection = self.backend.connect()
+        self.addCleanup(self.connection.close)
+        schema.upgrade(self.connection)
+
+    def run_threads(self, calls):
+        """Runs every call(connection) on its own thread and connection, all starting together."""
+        barrier = threading.Barrier(len(calls))
+
+        def run(call):
+            connection = self.backend.connect()
+            try:
+                barrier.wait()
+                return call(connection)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            return list(executor.map(run, calls))
+
+    def fetch_one(self, sql, args=()):
+        with self.connection.cursor() as curs:
+            curs.execute(sql, args)
+            return curs.fetchone()
+
+    def watch_qty(self, book_id, stop):
+        """Reads the book's qty until stop is set; returns the lowest value seen."""
+        connection = self.backend.connect()
+        lowest = None
+        try:
+            while not stop.is_set():
+                with connection.cursor() as curs:
+                    curs.execute("SELECT qty FROM book_list WHERE book_id = %s", (book_id,))
+                    qty = curs.fetchone()[0]
+                connection.rollback()
+                lowest = qty if lowest is None else min(lowest, qty)
+        finally:
+            connection.close()
+        return lowest
+
+    def test_last_copies_are_not_oversold(self):
+        copies = 7
+        ldb.add_book(self.connection, "B1", "Contended Book", "", "", 10.0, copies)
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as watcher:
+            lowest = watcher.submit(self.watch_qty, "B1", stop)
+            outcomes = self.run_threads([
+                lambda connection, n=n: ldb.issue_book(connection, "B1", f"R{n}", f"Student {n}", "BSc", "Physics",
+                                                       ISSUE_DATE, RETURN_DATE)
+                for n in range(THREADS)])
+            stop.set()
+        self.assertEqual(outcomes.count(ldb.ISSUED), copies)
+        self.assertEqual(outcomes.count(ldb.OUT_OF_STOCK), THREADS - copies)
+        self.assertEqual(self.fetch_one("SELECT qty FROM book_list WHERE book_id = 'B1'")[0], 0)
+        self.assertGreaterEqual(lowest.result(), 0)
+        self.assertEqual(self.fetch_one("SELECT COUNT(*) FROM loans WHERE book_id = 'B1'")[0], copies)
+        self.assertEqual(self.fetch_one("SELECT SUM(active_loans) FROM students")[0], copies)
+
+    def test_borrow_limit_holds_under_concurrent_issues(self):
+        for n in range(THREADS):
+            ldb.add_book(self.connection, f"B{n}", f"Book {n}", "", "", 10.0, 1)
+        outcomes = self.run_threads([
+            lambda connection, n=n: ldb.issue_book(connection, f"B{n}", "R1", "Student", "BSc", "Physics",
+                                                   ISSUE_DATE, RETURN_DATE)
+            for n in range(THREADS)])
+        self.assertEqual(outcomes.count(ldb.ISSUED), ldb.MAX_BORROW_LIMIT)
+        self.assertEqual(outcomes.count(ldb.LIMIT_REACHED), THREADS - ldb.MAX_BORROW_LIMIT)
+        self.assertEqual(self.fetch_one("SELECT active_loans FROM students WHERE stu_roll = 'R1'")[0],
+                         ldb.MAX_BORROW_LIMIT)
+        self.assertEqual(self.fetch_one("SELECT COUNT(*) FROM loans")[0], ldb.MAX_BORROW_LIMIT)
+        self.assertEqual(self.fetch_one("SELECT SUM(qty) FROM book_list")[0], THREADS - ldb.MAX_BORROW_LIMIT)
+
+    def test_batch_issues_are_not_oversold(self):
+        copies = 5
+        ldb.add_book(self.connection, "B1", "Contended Book", "", "", 10.0, copies)
+        ldb.add_book(self.connection, "B2", "Plentiful Book", "", "", 10.0, THREADS)
+        results = self.run_threads([
+            lambda connection, n=n: ldb.issue_books(connection, ["B1", "B2"], f"R{n}", f"Student {n}", "BA", "History",
+                                                    ISSUE_DATE, RETURN_DATE)
+            for n in range(THREADS)])
+        issued = [book_id for outcomes in results for book_id, outcome in outcomes if outcome == ldb.ISSUED]
+        self.assertEqual(issued.count("B1"), copies)
+        self.assertEqual(issued.count("B2"), THREADS)
+        self.assertEqual(self.fetch_one("SELECT qty FROM book_list WHERE book_id = 'B1'")[0], 0)
+        self.assertEqual(self.fetch_one("SELECT qty FROM book_list WHERE book_id = 'B2'")[0], 0)
+        self.assertEqual(self.fetch_one("SELECT SUM(active_loans) FROM students")[0], copies + THREADS)
+
+
+if __name__ == "__main__":
+    unittest.main()
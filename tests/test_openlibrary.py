@@ -0,0 +1,123 @@
+# OpenLibraryClient against a local stub of the Books API (no network needed).
+#
+#     python -m pytest tests/test_openlibrary.py
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+import bulk_import
+import credentials as cr
+import schema
+import storage
+from openlibrary import MAX_BIBKEYS, OpenLibraryClient
+
+KNOWN = {f"97800000{n:05d}": {'title': f"Book {n}", 'authors': [{'name': "Author"}],
+                              'publishers': [{'name': "Press"}], 'publish_date': "2001"}
+         for n in range(0, 200, 2)} # Even numbers are known, odd ones are not
+
+
+class StubBooksApi(BaseHTTPRequestHandler):
+    """Answers /api/books?bibkeys=ISBN:...&format=json&jscmd=data from KNOWN."""
+    requests_seen = []   # bibkeys count of every request
+    delay = 0.0          # Seconds to wait before answering
+    status = 200
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        keys = query.get('bibkeys', [""])[0].split(",")
+        type(self).requests_seen.append(len(keys))
+        if self.delay:
+            time.sleep(self.delay)
+        if url.path != "/api/books" or self.status != 200:
+            self.send_error(self.status if self.status != 200 else 404)
+            return
+        body = json.dumps({key: KNOWN[key[5:]] for key in keys if key[5:] in KNOWN}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OpenLibraryClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubBooksApi)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubBooksApi.requests_seen = []
+        StubBooksApi.delay, StubBooksApi.status = 0.0, 200
+        url = f"http://127.0.0.1:{self.server.server_address[1]}/api/books"
+        patcher = mock.patch.object(cr, 'openlibrary_url', url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = OpenLibraryClient(None, base_url=cr.openlibrary_url, timeout=2)
+
+    def test_fetch_books_sends_one_request_per_batch(self):
+        isbns = [f"97800000{n:05d}" for n in range(MAX_BIBKEYS)]
+        records = self.client.fetch_books(isbns)
+        self.assertEqual(StubBooksApi.requests_seen, [MAX_BIBKEYS])
+        self.assertEqual(set(records), set(isbns))
+        self.assertEqual(records[isbns[0]]['title'], "Book 0")
+
+    def test_import_batches_lookups_by_max_bibkeys(self):
+        connection = storage.SQLiteBackend(":memory:").connect()
+        self.addCleanup(connection.close)
+        schema.upgrade(connection)
+        copies = {f"97800000{n:05d}": 1 for n in range(2 * MAX_BIBKEYS + 10)}
+        result = bulk_import.run_import(connection, self.client, copies, bulk_import.ImportProgress(len(copies)))
+        self.assertEqual(sorted(StubBooksApi.requests_seen), [10, MAX_BIBKEYS, MAX_BIBKEYS])
+        self.assertEqual(len(result['added']), len(copies) // 2)
+        self.assertEqual(len(result['not_found']), len(copies) // 2)
+        self.assertEqual(result['failed'], [])
+
+    def test_unknown_isbn_is_none(self):
+        record, cached = self.client.fetch_book("9780000000001")
+        self.assertIsNone(record)
+        self.assertFalse(cached)
+        self.assertEqual(self.client.fetch_books(["9780000000001", "9780000000002"]),
+                         {"9780000000001": None, "9780000000002": KNOWN["9780000000002"]})
+
+    def test_timeout_raises(self):
+        StubBooksApi.delay = 1.0
+        client = OpenLibraryClient(None, base_url=cr.openlibrary_url, timeout=0.2)
+        with self.assertRaises(requests.exceptions.Timeout):
+            client.fetch_book("9780000000002")
+
+    def test_server_error_raises(self):
+        StubBooksApi.status = 500
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.fetch_books(["9780000000002"])
+
+    def test_import_records_failed_lookups(self):
+        StubBooksApi.status = 503
+        connection = storage.SQLiteBackend(":memory:").connect()
+        self.addCleanup(connection.close)
+        schema.upgrade(connection)
+        copies = {"9780000000002": 1, "9780000000003": 2}
+        result = bulk_import.run_import(connection, self.client, copies, bulk_import.ImportProgress(len(copies)))
+        self.assertEqual(sorted(result['failed']), sorted(copies))
+        self.assertEqual(result['added'], [])
+        self.assertEqual(len(result['errors']), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
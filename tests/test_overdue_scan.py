@@ -0,0 +1,62 @@
+# The overdue scan: streamed on a second pooled connection, and all-or-nothing.
+#
+#     python -m pytest tests/test_overdue_scan.py
+
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import library_db as ldb
+import schema
+import storage
+from db_pool import ConnectionPool
+
+TODAY = datetime.date(2026, 2, 1)
+DUE_DATES = ["2026-01-20", "2026-01-23", "2026-01-26", "2026-01-29", "2026-02-01"] # The last is not overdue yet
+
+
+class OverdueScanTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = storage.SQLiteBackend(os.path.join(directory.name, "library.sqlite3"), busy_timeout=1)
+        self.pool = ConnectionPool(self.backend.connect, size=3)
+        self.addCleanup(self.pool.close_all)
+        with self.pool.connection() as connection:
+            schema.upgrade(connection)
+            for n, due in enumerate(DUE_DATES):
+                ldb.add_book(connection, f"B{n}", f"Book {n}", "", "", 10.0, 1)
+                ldb.issue_book(connection, f"B{n}", f"R{n}", f"Student {n}", "BSc", "Physics", "2026-01-01", due)
+
+    def scan(self, min_interval=0):
+        with self.pool.connection() as connection, self.pool.connection() as reader:
+            return ldb.refresh_overdue_summary(connection, reader, TODAY, 0.5, min_interval=min_interval)
+
+    def summary(self):
+        with self.pool.connection() as connection:
+            return ldb.fetch_overdue_summary(connection)
+
+    def test_scan_fills_the_summary(self):
+        self.assertEqual(self.scan(), 4)
+        summary = self.summary()
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['rows'][0][:2], ("B0", "Book 0"))
+        self.assertEqual(summary['rows'][0][5:], (12, 6.0))
+        self.assertIsNone(self.scan(min_interval=3600)) # Fresh enough: skipped
+
+    def test_failed_scan_keeps_the_old_list_and_releases_the_lock(self):
+        self.scan()
+        connection, reader = self.backend.connect(), self.backend.connect() # Not pooled: nothing else rolls back
+        self.addCleanup(connection.close)
+        self.addCleanup(reader.close)
+        with mock.patch.object(ldb, '_copy_overdue_rows', side_effect=storage.OperationalError("lost connection")):
+            with self.assertRaises(storage.OperationalError):
+                ldb.refresh_overdue_summary(connection, reader, TODAY, 0.5)
+        self.assertEqual(self.summary()['count'], 4)
+        self.assertEqual(self.scan(), 4) # Would time out waiting for the write lock if it were still held
+
+
+if __name__ == "__main__":
+    unittest.main()
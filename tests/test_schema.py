@@ -0,0 +1,75 @@
+# Upgrading older databases with loans of books that are not in book_list, and the daily
+# rollups the upgraded schema keeps.
+#
+#     python -m pytest tests/test_schema.py
+
+import unittest
+from unittest import mock
+
+import library_db as ldb
+import schema
+import storage
+
+
+class OrphanLoanUpgradeTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = storage.SQLiteBackend(":memory:").connect()
+        self.addCleanup(self.connection.close)
+        with mock.patch.object(schema, 'MIGRATIONS', schema.MIGRATIONS[:3]):
+            schema.upgrade(self.connection)
+        with self.connection.cursor() as curs:
+            curs.execute("INSERT INTO book_list (book_id, book_name, author, edition, price, qty) "
+                         "VALUES ('B1', 'Kept Book', '', '', 10.0, 1)")
+            curs.execute("INSERT INTO borrow_record VALUES ('B1', 'Kept Book', 'R1', 'Ann', 'BSc', 'Physics', "
+                         "'2026-01-05', '2026-01-19')")
+        self.connection.commit()
+        with self.connection.cursor() as curs:
+            curs.execute("PRAGMA foreign_keys = OFF") # As in an old database whose book was deleted by hand
+            curs.execute("INSERT INTO borrow_record VALUES ('B9', 'Lost Book', 'R2', 'Bob', 'BA', 'History', "
+                         "'2026-01-05', '2026-01-19')")
+            curs.execute("PRAGMA foreign_keys = ON")
+        self.connection.commit()
+
+    def test_upgrade_refuses_orphan_loans_before_any_ddl(self):
+        with self.assertRaises(schema.SchemaError) as raised:
+            schema.upgrade(self.connection)
+        self.assertIn("(R2, B9)", str(raised.exception))
+        self.assertEqual(schema.current_version(self.connection), 3)
+        self.assertFalse(schema._table_exists(self.connection, 'loans'))
+        with self.connection.cursor() as curs:
+            curs.execute("SELECT COUNT(*) FROM borrow_record")
+            self.assertEqual(curs.fetchone()[0], 2)
+
+    def test_upgrade_runs_once_the_orphan_is_fixed(self):
+        with self.connection.cursor() as curs:
+            curs.execute("DELETE FROM borrow_record WHERE book_id = 'B9'")
+        self.connection.commit()
+        schema.upgrade(self.connection)
+        self.assertEqual(schema.current_version(self.connection), schema.MIGRATIONS[-1][0])
+        with self.connection.cursor() as curs:
+            curs.execute("SELECT stu_roll, book_id FROM loans")
+            self.assertEqual(curs.fetchall(), [('R1', 'B1')])
+
+
+class RollupTriggerTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = storage.SQLiteBackend(":memory:").connect()
+        self.addCleanup(self.connection.close)
+        schema.upgrade(self.connection)
+
+    def test_rollups_count_each_event_once(self):
+        ldb.add_book(self.connection, "B1", "Alpha", "", "", 1.0, 1)
+        ldb.add_book(self.connection, "B2", "Beta", "", "", 1.0, 5)
+        for book_id, stu_roll, course in (("B1", "R1", "BSc"), ("B2", "R1", "BSc"), ("B2", "R2", None)):
+            ldb.issue_book(self.connection, book_id, stu_roll, "Student", course, "Math", "2026-01-05", "2026-01-19")
+        ldb.reissue_book(self.connection, "B2", "R1", "2026-02-02")
+        ldb.return_books(self.connection, [("R1", "B1")])
+        with self.connection.cursor() as curs:
+            curs.execute("SELECT book_id, issued, returned, reissued, stockouts FROM loan_daily_book ORDER BY book_id")
+            self.assertEqual(curs.fetchall(), [("B1", 1, 1, 0, 1), ("B2", 2, 0, 1, 0)])
+            curs.execute("SELECT course, issued, returned, reissued, stockouts FROM loan_daily_course ORDER BY course")
+            self.assertEqual(curs.fetchall(), [("", 1, 0, 0, 0), ("BSc", 2, 1, 1, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
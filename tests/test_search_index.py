@@ -0,0 +1,44 @@
+# Incremental SearchIndex updates that race with a full rebuild.
+#
+#     python -m pytest tests/test_search_index.py
+
+import unittest
+
+from search_index import QTY, SearchIndex
+
+ROWS = [("B1", "Harry Potter", "Rowling", "1st", 10.0, 5), ("B2", "The Hobbit", "Tolkien", "", 8.0, 2)]
+
+
+class RebuildRaceTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.build(ROWS)
+
+    def qty(self, query):
+        return self.index.search(query)[0][QTY]
+
+    def test_qty_change_committed_before_the_load(self):
+        self.index.begin_build()
+        self.index.adjust_qty("B1", -1)
+        self.assertEqual(self.qty("harry"), 4)
+        self.index.finish_build([ROWS[0][:QTY] + (4,), ROWS[1]]) # The load saw the issue
+        self.assertEqual(self.qty("harry"), 4)
+
+    def test_qty_change_committed_after_the_load(self):
+        self.index.begin_build()
+        self.index.adjust_qty("B1", -1)
+        self.index.adjust_qty("B1", -1)
+        self.index.finish_build(ROWS) # Loaded before either issue
+        self.assertEqual(self.qty("harry"), 3)
+
+    def test_updates_and_removals_are_replayed(self):
+        self.index.begin_build()
+        self.index.add_or_update(("B3", "Dune", "Herbert", "", 9.0, 1))
+        self.index.remove("B2")
+        self.index.finish_build(ROWS)
+        self.assertEqual([row[0] for row in self.index.search("dune")], ["B3"])
+        self.assertEqual(self.index.search("hobbit"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
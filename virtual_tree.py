@@ -0,0 +1,116 @@
+# Virtual scrolling for large Treeviews. Only a bounded window of rows is kept in the widget;
+# pages are fetched with keyset pagination as the scrollbar nears either end, and rows that
+# scroll far out of view are dropped, so memory and first paint stay flat for any table size.
+
+from collections import deque
+from functools import partial
+
+import instrumentation
+
+
+class PagedTreeLoader:
+    """
+    Feeds a Treeview page by page in key order.
+    The loader does not run queries itself: request_page(after, before, limit, callback)
+    must fetch up to `limit` rows strictly after (or before) the given key, in ascending
+    key order, and later call callback(rows) on the Tk main thread.
+    """
+    def __init__(self, request_page, format_rows, key_of, page_size=150, max_rows=600,
+                 prefetch_rows=40, on_loaded=None):
+        """
+        Args:
+            request_page (callable): Page fetcher, see class docstring.
+            format_rows (callable): Turns a page of raw rows into Treeview values (see row_format.py).
+            key_of (callable): Returns the sort key of a raw row, e.g. (book_name, book_id).
+            page_size (int): Rows fetched per request.
+            max_rows (int): Rows kept in the widget before the far end is trimmed.
+            prefetch_rows (int): Load the next page when the view is this close to an edge.
+            on_loaded (callable): Called with the loader after each page is applied.
+        """
+        if max_rows < 2 * page_size:
+            raise ValueError("max_rows must hold at least two pages.")
+        self.request_page = request_page
+        self.format_rows = format_rows
+        self.key_of = key_of
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.prefetch_rows = prefetch_rows
+        self.on_loaded = on_loaded
+
+        self.tree = None
+        self._keys = deque()   # Sort key of every row in the widget, in display order
+        self.at_start = True   # True once the first row of the table is in the widget
+        self.at_end = False    # True once the last row of the table is in the widget
+        self.loading = False
+
+    @property
+    def row_count(self):
+        return len(self._keys)
+
+    def attach(self, tree):
+        """Binds the loader to the Treeview it fills (its yscrollcommand must call on_yscroll)."""
+        self.tree = tree
+
+    def start(self):
+        """Clears the widget and loads the first page."""
+        if self.tree.get_children():
+            self.tree.delete(*self.tree.get_children())
+        self._keys.clear()
+        self.at_start, self.at_end = True, False
+        self._load("down", after=None, before=None)
+
+    def on_yscroll(self, first, last):
+        """Scroll hook: fetches another page when the visible area nears a loaded edge."""
+        if self.tree is None or self.loading or not self._keys:
+            return
+        margin = min(0.5, self.prefetch_rows / len(self._keys))
+        if float(last) >= 1.0 - margin and not self.at_end:
+            self._load("down", after=self._keys[-1], before=None)
+        elif float(first) <= margin and not self.at_start:
+            self._load("up", after=None, before=self._keys[0])
+
+    # --- Internal Helpers ---
+    def _load(self, direction, after, before):
+        self.loading = True
+        self.request_page(after, before, self.page_size, partial(self._on_page, direction))
+
+    def _on_page(self, direction, rows):
+        self.loading = False
+        if self.tree is None or not self.tree.winfo_exists():
+            return
+        tree = self.tree
+        old_count = len(self._keys)
+        top_index = round(float(tree.yview()[0]) * old_count) if old_count else 0
+        shift = 0  # How many rows were added (+) or removed (-) above the current view
+
+        with instrumentation.span("ui.format_rows"):
+            values = self.format_rows(rows)
+        with instrumentation.span("ui.tree_insert"):
+            if direction == "down":
+                self.at_end = len(rows) < self.page_size
+                for row, row_values in zip(rows, values):
+                    tree.insert("", 'end', values=row_values)
+                    self._keys.append(self.key_of(row))
+                excess = len(self._keys) - self.max_rows
+                if excess > 0:
+                    tree.delete(*tree.get_children()[:excess])
+                    for _ in range(excess): self._keys.popleft()
+                    self.at_start = False
+                    shift = -excess
+            else:
+                self.at_start = len(rows) < self.page_size
+                for index, row_values in enumerate(values):
+                    tree.insert("", index, values=row_values)
+                self._keys.extendleft(self.key_of(row) for row in reversed(rows))
+                shift = len(rows)
+                excess = len(self._keys) - self.max_rows
+                if excess > 0:
+                    tree.delete(*tree.get_children()[-excess:])
+                    for _ in range(excess): self._keys.pop()
+                    self.at_end = False
+
+        # Keep the same rows on screen even though rows were added/removed above them
+        if shift and self._keys:
+            tree.yview_moveto(max(0, top_index + shift) / len(self._keys))
+        if self.on_loaded:
+            self.on_loaded(self)
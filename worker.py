@@ -0,0 +1,157 @@
+# Background executor for slow work (database queries, network calls). Jobs run on worker
+# threads and their results are handed back to the Tk main thread through a queue that is
+# drained by a window.after() poll loop, so no worker ever touches a widget.
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class Ticket:
+    """Handle for a submitted job. Cancelling it skips the job if it has not started yet
+    and always drops its callbacks, so a stale result never reaches the screen."""
+    def __init__(self, group, cancellable):
+        self.group = group
+        self.cancellable = cancellable
+        self.future = None
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        self._cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundWorker:
+    """
+    Runs callables on a small thread pool and delivers results on the Tk main thread.
+    Jobs are tagged with a group name so a whole screen's worth of pending work can be
+    cancelled at once (e.g. when the user navigates away).
+    """
+    def __init__(self, window, max_workers=3, poll_ms=30, on_activity=None, on_unhandled=None):
+        """
+        Args:
+            window: Tk widget used to schedule the result poll loop.
+            max_workers (int): Number of worker threads.
+            poll_ms (int): How often (ms) finished results are collected while jobs are running.
+            on_activity (callable): Called on the main thread with the in-flight job count whenever it changes.
+            on_unhandled (callable): Called on the main thread with (message, exception) when a job
+                without on_error fails or a result callback raises (a GUI has no console to print to).
+        """
+        self.window = window
+        self.poll_ms = poll_ms
+        self.on_activity = on_activity
+        self.on_unhandled = on_unhandled
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bg-worker")
+        self._results = queue.Queue()
+        self._tickets = set()   # Tickets not yet delivered (main thread only)
+        self._polling = False
+        self._closed = False
+
+    @property
+    def in_flight(self):
+        """Number of submitted jobs whose results have not been delivered yet."""
+        return len(self._tickets)
+
+    def submit(self, job, on_done=None, on_error=None, group="screen", cancellable=True, pass_ticket=False):
+        """
+        Queues job() to run on a worker thread. Must be called from the main thread.
+        Args:
+            job (callable): Work to run in the background; its return value goes to on_done.
+            on_done (callable): Called on the main thread with the job's result.
+            on_error (callable): Called on the main thread with the exception if the job raised.
+            group (str): Cancellation group, see cancel_group().
+            cancellable (bool): False for writes that must finish and report back even if
+                the user leaves the screen.
+            pass_ticket (bool): Call job(ticket) instead of job(), so long-running jobs (e.g. a
+                download) can check ticket.cancelled and stop early.
+        Returns:
+            Ticket: Handle that can be used to cancel this job.
+        """
+        ticket = Ticket(group, cancellable)
+        if self._closed:
+            ticket.cancel()
+            return ticket
+        self._tickets.add(ticket)
+        if pass_ticket:
+            job = partial(job, ticket)
+        ticket.future = self._executor.submit(self._run, ticket, job, on_done, on_error)
+        self._notify_activity()
+        self._ensure_polling()
+        return ticket
+
+    def cancel_group(self, group):
+        """Cancels every cancellable, undelivered job in the given group."""
+        for ticket in list(self._tickets):
+            if ticket.group == group and ticket.cancellable:
+                ticket.cancel()
+                if ticket.future.cancelled(): # Never started, so it will never report back
+                    self._tickets.discard(ticket)
+        self._notify_activity()
+
+    def shutdown(self):
+        """Stops accepting work and abandons pending jobs (used on application exit)."""
+        self._closed = True
+        for ticket in list(self._tickets):
+            ticket.cancel()
+        self._tickets.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Worker Thread Side ---
+    def _run(self, ticket, job, on_done, on_error):
+        if ticket.cancelled:
+            self._results.put((ticket, None, None, None))
+            return
+        try:
+            result = job()
+        except Exception as e:
+            self._results.put((ticket, on_error, e, True))
+        else:
+            self._results.put((ticket, on_done, result, False))
+
+    # --- Main Thread Side ---
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.window.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Delivers finished results; keeps polling while anything is still running."""
+        delivered = False
+        while True:
+            try:
+                ticket, callback, payload, failed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            delivered = True
+            self._tickets.discard(ticket)
+            if ticket.cancelled or callback is None:
+                if failed and callback is None and not ticket.cancelled:
+                    self._report("Background job failed", payload)
+                continue
+            try:
+                callback(payload)
+            except Exception as e: # A broken callback must not kill the poll loop
+                self._report("Error in background job callback", e)
+        if delivered:
+            self._notify_activity()
+        if self._tickets and not self._closed:
+            self.window.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def _report(self, message, error):
+        if self.on_unhandled is None:
+            return
+        try:
+            self.on_unhandled(message, error)
+        except Exception:
+            pass # Reporting must not kill the poll loop either
+
+    def _notify_activity(self):
+        if self.on_activity:
+            self.on_activity(len(self._tickets))